@@ -22,7 +22,7 @@
 from collections import OrderedDict
 from accelergy.utils.utils import *
 from accelergy.parsing_utils import count_num_identical_comps
-from accelergy.plug_in_interface.query_plug_ins import get_best_estimate
+from accelergy.plug_in_interface.query_plug_ins import EstimationMemo
 
 
 class AreaReferenceTableGenerator:
@@ -31,18 +31,35 @@ class AreaReferenceTableGenerator:
         cc_components = info['ccs']
         self.precision = info['precision']
         self.estimation_plug_ins = info['plug_ins']
+        self.estimation_memo = info.get('estimation_memo', None)
+        if self.estimation_memo is None:
+            self.estimation_memo = EstimationMemo(self.estimation_plug_ins, info.get('estimation_cache', None))
         self.parser_version = info['parser_version']
         self.ART = ART(self.parser_version)
 
+        # Estimate all primitives up front so plug-ins can be queried in batches
+        self.estimation_memo.prefetch(self.get_queries(pc_components, cc_components), False,
+                                      info.get('jobs', 1), info.get('concurrency', 1))
         for pc_name, pc in pc_components.items():
             self.generate_pc_ART(pc)
         for cc_name, cc in cc_components.items():
             self.generate_cc_ART(cc)
 
+    @staticmethod
+    def area_query(component):
+        return {'class_name': component.get_class_name(),
+                'attributes': component.get_attributes()}
+
+    def get_queries(self, pc_components, cc_components):
+        """ All primitive area queries that are estimated for the ART, in order """
+        queries = [self.area_query(pc) for pc in pc_components.values()]
+        for cc_name, cc in cc_components.items():
+            queries += [self.area_query(subcomp_obj) for subcomp_obj in cc.get_subcomponents().values()]
+        return queries
+
     def generate_pc_ART(self, pc):
         pc_name = pc.get_name()
-        estimation_plug_in_interface = {'class_name': pc.get_class_name(),
-                                        'attributes': pc.get_attributes()}
+        estimation_plug_in_interface = self.area_query(pc)
         estimation = self.eval_primitive_area(estimation_plug_in_interface)
         estimated_area, estimator_name = estimation.get_value() * 1e12, estimation.estimator_name
         area_share = pc.get_area_share()
@@ -56,8 +73,7 @@ class AreaReferenceTableGenerator:
         cc_area = 0
         estimators = []
         for subcomp_name, subcomp_obj in cc.get_subcomponents().items():
-            estimation_plug_in_interface = {'class_name': subcomp_obj.get_class_name(),
-                                            'attributes': subcomp_obj.get_attributes()}
+            estimation_plug_in_interface = self.area_query(subcomp_obj)
             estimation = self.eval_primitive_area(estimation_plug_in_interface)
             estimated_area, estimator_name = estimation.get_value() * 1e12, estimation.estimator_name
             factored_estimated_area = estimated_area * subcomp_obj.get_area_share()
@@ -76,7 +92,7 @@ class AreaReferenceTableGenerator:
         return self.ART
 
     def eval_primitive_area(self, estimator_plug_in_interface):
-        return get_best_estimate(self.estimation_plug_ins, estimator_plug_in_interface, False)
+        return self.estimation_memo.get_best_estimate(estimator_plug_in_interface, False)
 
 class ART:
     def __init__(self, parser_version):
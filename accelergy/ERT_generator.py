@@ -23,7 +23,7 @@ from collections import OrderedDict
 from accelergy.utils.utils import *
 from accelergy.parsing_utils import count_num_identical_comps
 from accelergy.parsing_utils import comp_name_within_range
-from accelergy.plug_in_interface.query_plug_ins import get_best_estimate
+from accelergy.plug_in_interface.query_plug_ins import EstimationMemo
 
 def ERT_dict_to_obj(ERT_info):
     ERT_dict = ERT_info['ERT_dict']
@@ -51,8 +51,14 @@ class EnergyReferenceTableGenerator:
         self.parser_version = info['parser_version']
         self.precision = info['precision']
         self.estimation_plug_ins = info['plug_ins']
+        self.estimation_memo = info.get('estimation_memo', None)
+        if self.estimation_memo is None:
+            self.estimation_memo = EstimationMemo(self.estimation_plug_ins, info.get('estimation_cache', None))
         self.ERT = ERT(self.parser_version, self.precision)
 
+        # Estimate all primitives up front so plug-ins can be queried in batches
+        self.estimation_memo.prefetch(self.get_queries(pc_components, cc_components), True,
+                                      info.get('jobs', 1), info.get('concurrency', 1))
         for pc_name, pc in pc_components.items():
             self.generate_pc_ERT(pc)
         for cc_name, cc in cc_components.items():
@@ -61,15 +67,38 @@ class EnergyReferenceTableGenerator:
     def get_ERT(self):
         return self.ERT
 
+    @staticmethod
+    def action_query(class_name, attributes, action_obj):
+        return {'class_name': class_name,
+                'attributes': attributes,
+                'action_name': action_obj.get_name(),
+                'arguments': action_obj.get_arguments()}
+
+    def get_queries(self, pc_components, cc_components):
+        """ All primitive action queries that are estimated for the ERT, in order """
+        queries = []
+        for pc_name, pc in pc_components.items():
+            for pc_action_obj in pc.get_actions():
+                queries.append(self.action_query(pc.get_class_name(), pc.get_attributes(), pc_action_obj))
+        for cc_name, cc in cc_components.items():
+            primitive_type = cc.get_primitive_type()
+            sub_base_name_map = self.construct_sub_base_name_map(cc)
+            for cc_action_obj in cc.get_actions():
+                if primitive_type is not None:
+                    queries.append(self.action_query(primitive_type, cc.get_attributes(), cc_action_obj))
+                    continue
+                for subcomp_name, subaction_obj in cc_action_obj.get_primitive_list():
+                    subcomp_obj = sub_base_name_map[remove_brackets(subcomp_name)]
+                    queries.append(self.action_query(subcomp_obj.get_class_name(),
+                                                     subcomp_obj.get_attributes(), subaction_obj))
+        return queries
+
     def generate_pc_ERT(self, pc):
         pc_name = pc.get_name()
         for pc_action_obj in pc.get_actions():
             action_name = pc_action_obj.get_name()
             arguments = pc_action_obj.get_arguments()
-            estimation_plug_in_interface = {'class_name': pc.get_class_name(),
-                                           'attributes': pc.get_attributes(),
-                                           'action_name': action_name,
-                                           'arguments': arguments}
+            estimation_plug_in_interface = self.action_query(pc.get_class_name(), pc.get_attributes(), pc_action_obj)
             estimation = self.eval_primitive_action_energy(estimation_plug_in_interface)
             self.ERT.add_action_entry({'name': pc_name,
                                 'action_name': action_name,
@@ -87,13 +116,10 @@ class EnergyReferenceTableGenerator:
             cc_action_name = cc_action_obj.get_name()
             cc_arguments = cc_action_obj.get_arguments()
             if primitive_type is not None:
-                estimation_plug_in_interface = {'class_name': primitive_type,
-                                                'attributes': cc.get_attributes(),
-                                                'action_name': cc_action_name,
-                                                'arguments': cc_arguments}
+                estimation_plug_in_interface = self.action_query(primitive_type, cc.get_attributes(), cc_action_obj)
                 estimation = self.eval_primitive_action_energy(estimation_plug_in_interface)
                 energy = estimation.get_value() * 1e12
-                primitive_action_estimations = estimator_name
+                primitive_action_estimations = estimation.estimator_name
             else:
                 energy = 0
                 primitive_action_tuples = cc_action_obj.get_primitive_list()
@@ -101,10 +127,8 @@ class EnergyReferenceTableGenerator:
                     subcomp_name = primitive_action_tuple[0]
                     subaction_obj = primitive_action_tuple[1]
                     subcomp_obj = sub_base_name_map[remove_brackets(subcomp_name)]
-                    estimation_plug_in_interface = {'class_name': subcomp_obj.get_class_name(),
-                                                    'attributes': subcomp_obj.get_attributes(),
-                                                    'action_name': subaction_obj.get_name(),
-                                                    'arguments': subaction_obj.get_arguments()}
+                    estimation_plug_in_interface = self.action_query(subcomp_obj.get_class_name(),
+                                                                     subcomp_obj.get_attributes(), subaction_obj)
                     estimation = self.eval_primitive_action_energy(estimation_plug_in_interface)
                     # check if the subcomponent name is a list, if so, take it into account using list length
                     estimated_energy = estimation.get_value() * 1e12
@@ -131,7 +155,14 @@ class EnergyReferenceTableGenerator:
         return sub_base_name_map
 
     def eval_primitive_action_energy(self, estimator_plug_in_interface):
-        return get_best_estimate(self.estimation_plug_ins, estimator_plug_in_interface, True)
+        return self.estimation_memo.get_best_estimate(estimator_plug_in_interface, True)
+
+
+def freeze_arguments(arguments):
+    """ Hashable form of action arguments that does not depend on their order """
+    if arguments is None:
+        return None
+    return tuple(sorted(arguments.items()))
 
 
 class ERT:
@@ -140,11 +171,15 @@ class ERT:
         self.base_name_map = {}
         self.parser_version = parser_version
         self.precision = precision
+        # component names that were checked to be within the range of their entries -> entries
+        self.checked_names = {}
 
     def add_action_entry(self, entry_dict):
         comp_name = entry_dict['name']
         if comp_name not in self.entries:
             self.entries[comp_name] = ComponentERTEntry(comp_name, self.precision)
+            self.base_name_map[remove_brackets(comp_name)] = comp_name
+            self.checked_names.clear()
         self.entries[comp_name].add_action_energy(entry_dict)
 
     def get_ERT(self):
@@ -155,28 +190,30 @@ class ERT:
         return ERT
 
     def get_ERT_entry(self, component_name):
+        if component_name in self.checked_names:
+            return self.checked_names[component_name]
         component_base_name = remove_brackets(component_name)
         ERT_entry = self.get_ERT_entry_w_base_name(component_base_name)
         ASSERT_MSG(ERT_entry is not None, 'Cannot find corresponding entry for component %s' % component_name)
         ASSERT_MSG(comp_name_within_range(component_name, ERT_entry.get_component_name()),
                    'component name "%s" in action counts is not legal, legal range should be within "%s"'
                    %(component_name, ERT_entry.get_component_name()))
+        self.checked_names[component_name] = ERT_entry
         return ERT_entry
 
     def get_ERT_entry_w_base_name(self, component_base_name):
-        self.get_base_name_map()
         if component_base_name not in self.base_name_map: return None
         entry_name = self.base_name_map[component_base_name]
         ERT_entry = self.entries[entry_name]
         return ERT_entry
 
     def get_base_name_map(self):
-        if self.base_name_map == {}:
-            for complete_name in self.entries:
-                base_name = remove_brackets(complete_name)
-                self.base_name_map[base_name] = complete_name
         return self.base_name_map
 
+    def get_action_energy(self, component_name, action_entry_obj):
+        """ Energy of an action of a component, looked up by its base name, action, and arguments """
+        return self.get_ERT_entry(component_name).get_action_energy(action_entry_obj)
+
     def get_ERT_summary(self):
         ERT_summary_list = []
         for comp_name, ERT_entry_obj in self.entries.items():
@@ -197,11 +234,18 @@ class ComponentERTEntry:
         self.action_entries = {}
         self.estimator_s = {}
         self.precision = precision
+        # (action name, frozen arguments) -> position of the first such combination in action_entries
+        self.combination_index = {}
 
     def add_action_energy(self, action_dict):
         action_name = action_dict['action_name']
         if action_name not in self.action_entries:
             self.action_entries[action_name] = []
+        try:
+            key = (action_name, freeze_arguments(action_dict['arguments']))
+            self.combination_index.setdefault(key, len(self.action_entries[action_name]))
+        except TypeError:  # unhashable argument values can only be found by scanning
+            pass
 
         arguments = action_dict['arguments']
         energy = action_dict['energy']
@@ -239,19 +283,30 @@ class ComponentERTEntry:
 
     def get_action_energy(self, action_entry_obj):
         action_name = action_entry_obj.get_action_name()
-        action_args = action_entry_obj.get_action_args()
+        position = self.find_combination(action_name, action_entry_obj.get_action_args())
+        return self.action_entries[action_name][position]['energy']
+
+    def find_combination(self, action_name, action_args):
+        """
+        Position in action_entries of the argument combination whose energy an action uses. An
+        action without arguments uses the first combination, and an action with some of the
+        arguments uses the first combination that matches them.
+        """
         action_list = self.action_entries[action_name]
-        for arg_combo in action_list:
+        if action_args is not None:
+            try:
+                return self.combination_index[(action_name, freeze_arguments(action_args))]
+            except (KeyError, TypeError):
+                pass
+        for position, arg_combo in enumerate(action_list):
             if action_args is None:
-                return arg_combo['energy']
-            for arg_name, arg_val in action_args.items():
-                matched = True
-                if not arg_combo['arguments'][arg_name] == arg_val:
-                    matched = False
-                    break
+                return position
+            combo_args = arg_combo['arguments'] if arg_combo['arguments'] is not None else {}
+            matched = all(arg_name in combo_args and combo_args[arg_name] == arg_val
+                          for arg_name, arg_val in action_args.items())
             if matched:
-                return arg_combo['energy']
-        ASSERT_MSG(matched, 'cannot find corresponding action energy in ERT for component "%s" '
+                return position
+        ERROR_CLEAN_EXIT('cannot find corresponding action energy in ERT for component "%s" '
                          'action "%s", argument "%s"'%(self.component_name, action_name, action_args))
 
     def get_ERT_entry_dict_rep(self):
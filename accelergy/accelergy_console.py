@@ -31,6 +31,11 @@ from accelergy.compound_component import CompoundComponent
 from accelergy.ERT_generator import EnergyReferenceTableGenerator, ERT_dict_to_obj
 from accelergy.ART_generator import AreaReferenceTableGenerator
 from accelergy.energy_calculator import EnergyCalculator
+from accelergy.plug_in_interface.estimation_cache import EstimationCache
+from accelergy.plug_in_interface.query_plug_ins import EstimationMemo
+from accelergy.plug_in_interface.plug_in_profiler import PlugInProfiler, set_profiler
+from accelergy.plug_in_interface.watchdog import Watchdog, set_watchdog
+from accelergy.utils.yaml import ParsedYAMLCache, set_parsed_yaml_cache
 from accelergy.input_output import parse_commandline_args, generate_output_files
 from accelergy.utils.utils import *    
 import accelergy.version as version
@@ -48,6 +53,9 @@ def run():
     scripts = [] # args.scripts Script support disabled. PyTimeloop preprocessing should be used instead.
     extra_plugins = args.extra_plugins
     version.SUPPRESS_VERSION_ERRORS = args.suppress_version_errors
+    accelergy.parsing_utils.reset_parsing_state()
+    parsed_yaml_cache = ParsedYAMLCache() if args.cache_inputs else None
+    set_parsed_yaml_cache(parsed_yaml_cache)
     logging.getLogger().setLevel(logging.INFO if not args.verbose else logging.DEBUG)
     # interpret desired output files
     oflags = {'ERT': 0, 'ERT_summary': 0, 'ART': 0, 'ART_summary': 0,
@@ -75,8 +83,15 @@ def run():
     system_state.set_flag_s(oflags)
 
     # ----- Load Raw Inputs to Parse into Dicts
-    raw_input_info = {'path_arglist': path_arglist, 'parser_version': accelergy_version}
+    # action counts and ERTs are only parsed if they are used for the desired outputs
+    needed_top_keys = {'architecture', 'compound_components', 'flattened_architecture', 'variables'}
+    if compute_ERT: needed_top_keys.add('ERT')
+    if compute_energy_estimate: needed_top_keys.add('action_counts')
+    raw_input_info = {'path_arglist': path_arglist, 'parser_version': accelergy_version,
+                      'needed_top_keys': needed_top_keys, 'jobs': args.jobs}
     raw_dicts = RawInputs2Dicts(raw_input_info, args.update_config_version)
+    if parsed_yaml_cache is not None:
+        parsed_yaml_cache.log_statistics()
 
     # ----- Determine what operations should be performed
     available_inputs = raw_dicts.get_available_inputs()
@@ -97,11 +112,13 @@ def run():
         #    (2) ERT needed but bot provided,
         #    (3) ART needed
 
-        # ----- Add the Component Classes
-        for pc_name, pc_info in raw_dicts.get_pc_classses().items():
-            system_state.add_pc_class(ComponentClass(pc_info))
-        for cc_name, cc_info in raw_dicts.get_cc_classses().items():
-            system_state.add_cc_class(ComponentClass(cc_info))
+        # ----- Add the Component Classes that the architecture uses
+        pc_classes, cc_classes = raw_dicts.get_pc_classses(), raw_dicts.get_cc_classses()
+        for class_name in raw_dicts.get_referenced_class_names():
+            if class_name in cc_classes:
+                system_state.add_cc_class(ComponentClass(cc_classes[class_name]))
+            elif class_name in pc_classes:
+                system_state.add_pc_class(ComponentClass(pc_classes[class_name]))
 
         # ----- Set Architecture Spec (all attributes defined)
         arch_obj = arch_dict_2_obj(raw_dicts.get_flatten_arch_spec_dict(), system_state.cc_classes, system_state.pc_classes)
@@ -129,6 +146,18 @@ def run():
                 raw_dicts.get_python_plug_in_paths() + extra_plugins,
                 output_prefix),
         )
+        if args.profile_plugins:
+            system_state.set_plug_in_profiler(PlugInProfiler())
+            set_profiler(system_state.plug_in_profiler)
+        if args.cache_estimations:
+            system_state.set_estimation_cache(
+                EstimationCache(system_state.plug_ins, args.cache_dir, args.cache_size,
+                                args.accuracy_ceiling))
+        system_state.set_estimation_memo(
+            EstimationMemo(system_state.plug_ins, system_state.estimation_cache,
+                           args.accuracy_ceiling))
+        if args.query_timeout is not None or args.estimation_budget is not None:
+            set_watchdog(Watchdog(args.query_timeout, args.estimation_budget))
 
     if compute_ERT and 'ERT' in available_inputs:
         # ERT/ ERT_summary/ energy estimates need to be generated with provided ERT
@@ -145,6 +174,9 @@ def run():
                                                      'pcs': system_state.pcs,
                                                      'ccs': system_state.ccs,
                                                      'plug_ins': system_state.plug_ins,
+                                                     'estimation_memo': system_state.estimation_memo,
+                                                     'jobs': args.jobs,
+                                                     'concurrency': args.concurrency,
                                                      'precision': precision})
             system_state.set_ERT(ert_gen.get_ERT())
 
@@ -163,9 +195,15 @@ def run():
                                                'pcs': system_state.pcs,
                                                'ccs': system_state.ccs,
                                                'plug_ins': system_state.plug_ins,
+                                               'estimation_memo': system_state.estimation_memo,
+                                               'jobs': args.jobs,
+                                               'concurrency': args.concurrency,
                                                'precision': precision})
         system_state.set_ART(art_gen.get_ART())
 
+    if system_state.estimation_memo is not None:
+        system_state.estimation_memo.log_statistics()
+
     # ----- Generate All Necessary Output Files
     generate_output_files(system_state)
 
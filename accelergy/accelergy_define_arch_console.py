@@ -23,7 +23,8 @@ from accelergy.system_state import SystemState
 from accelergy.input_output import parse_commandline_args, generate_output_files
 from accelergy.utils.utils import *
 import accelergy.version as version
-from accelergy.utils.yaml import write_yaml_file
+from accelergy.utils.yaml import ParsedYAMLCache, set_parsed_yaml_cache, write_yaml_file
+from accelergy.parsing_utils import reset_parsing_state
 
 def run():
     accelergy_version = version.__version__
@@ -33,14 +34,17 @@ def run():
     output_prefix = args.oprefix
     path_arglist = args.files
     output_path = args.outdir
+    reset_parsing_state()
+    set_parsed_yaml_cache(ParsedYAMLCache() if args.cache_inputs else None)
 
     # ----- Global Storage of System Info
     system_state = SystemState()
     system_state.set_accelergy_version(accelergy_version)
 
     # ----- Load Raw Inputs to Parse into Dicts
-    raw_input_info = {'path_arglist': path_arglist, 'parser_version': accelergy_version}
-    raw_dicts = RawInputs2Dicts(raw_input_info)
+    raw_input_info = {'path_arglist': path_arglist, 'parser_version': accelergy_version,
+                      'needed_top_keys': {'architecture', 'variables'}}
+    raw_dicts = RawInputs2Dicts(raw_input_info, load_libraries=False)
 
     # ----- Interpret the input architecture description using only the input information (w/o class definitions)
     system_state.set_hier_arch_spec(raw_dicts.get_hier_arch_spec_dict())
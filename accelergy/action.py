@@ -1,11 +1,17 @@
-from copy import deepcopy
+import copy
 
 from accelergy.utils.utils import *
 from accelergy.parsing_utils import *
 
 
 class Action(object):
-    """Action class"""
+    """
+    Action class
+
+    Actions are not changed once they are flattened. Defining an action (e.g. evaluating its
+    arguments) creates a new action with replace(), which shares the unchanged fields, including
+    the nested subcomponent action lists, with the original.
+    """
     def __init__(self, action_def_dict):
 
         self.action_def_dict = action_def_dict
@@ -43,6 +49,14 @@ class Action(object):
                     subcompActions.append(Action(subcompAction))
                 self._subcomponents[subcomp['name']] = subcompActions
 
+    def replace(self, **fields):
+        """ Returns a copy of this action with the given fields (e.g. action_share=2) replaced """
+        action = copy.copy(self)
+        for field_name, value in fields.items():
+            ASSERT_MSG(hasattr(action, '_' + field_name), 'action does not have field %s' % field_name)
+            setattr(action, '_' + field_name, value)
+        return action
+
     def set_primitive_list(self, primitive_list):
         self._primitive_list = primitive_list
 
@@ -120,9 +134,7 @@ class Action(object):
                 arg_range = range_record[1] - range_record[0] + 1
                 arg_def[arg_name] = (entry_idx // offset) % arg_range + range_record[0]
                 offset *= arg_range
-            subcomp_list = []
-            new_action = deepcopy(self); new_action._arguments = arg_def
-            action_list.append(new_action)
+            action_list.append(self.replace(arguments=arg_def))
         return action_list
 
     @staticmethod
@@ -36,12 +36,12 @@ def fully_define_arch_dict(arch_dict, cc_classes, pc_classes):
         attrs_to_be_applied = class_obj.get_default_attr_to_apply(cinfo['attributes'])
         for attr_name, attr_val in attrs_to_be_applied.items():
             cinfo['attributes'][attr_name] = attr_val
-        for attr_name, attr_val in cinfo['attributes'].items():
-            if isinstance(attr_val, str):
-                if attr_val in cinfo['attributes']:
-                    cinfo['attributes'][attr_name] = cinfo['attributes'][attr_val]
-                v = parse_expression_for_arithmetic(attr_val, cinfo['attributes'], class_name, use_bindings_after=attr_name)
-                cinfo['attributes'][attr_name] = v
+        # Each attribute may refer to the attributes before it, or to later ones as in compound
+        # component attributes
+        parsed_attrs = parse_expressions_sequentially_replacing_bindings(
+            cinfo['attributes'], {}, '%s.' % cname, parse_non_strings=False)
+        for attr_name, attr_val in parsed_attrs.items():
+            cinfo['attributes'][attr_name] = attr_val
 
     return arch_dict
 
@@ -85,14 +85,7 @@ class Architecture(object):
     @staticmethod
     def remove_brackets(name):
         """Removes the brackets from a component name in a list"""
-        if '[' not in name and ']' not in name:
-            return name
-        if '[' in name and ']' in name:
-            start_idx = name.find('[')
-            end_idx = name.find(']')
-            name = name[:start_idx] + name[end_idx + 1:]
-            name = Architecture.remove_brackets(name)
-            return name
+        return ComponentName.get(name).base_name
 
 class ArchComp():
     def __init__(self, comp_dict):
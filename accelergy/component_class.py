@@ -23,6 +23,9 @@ class ComponentClass:
         else:
             self.type = 'primitive'
         self._primitive_type = class_dict['primitive_type'] if 'primitive_type' in class_dict else None
+        self._subcomponent_template = None
+        # (attribute signature, area share) -> first compound component defined with them
+        self.flattened_instances = {}
 
     def add_action(self, action):
         ASSERT_MSG('name' in action, '%s class actions must contain "name" keys'%(self.get_name()))
@@ -78,5 +81,23 @@ class ComponentClass:
         ASSERT_MSG(self._subcomponents is not None, 'component class %s does not have subcomponents' % self.get_name())
         return self._subcomponents
 
+    def get_subcomponent_template(self):
+        """
+        The subcomponents with the expressions that do not depend on the instance (e.g.
+        "2 * 1024") evaluated once. Instances define copies of the template.
+        """
+        if self._subcomponent_template is None:
+            template = OrderedDict()
+            for sub_name, subcomponent in self.get_subcomponents_as_dict().items():
+                subcomponent = Subcomponent(dict(deepcopy(subcomponent.dict_reprsentation))).copy()
+                attributes = subcomponent.get_attributes()
+                for attr_name, attr_val in attributes.items():
+                    attributes[attr_name] = fold_constant(attr_val, f'{sub_name}."{attr_name}"')
+                subcomponent.set_area_share(fold_constant(
+                    subcomponent.get_area_share(), f'{sub_name}.area_share', strings_allowed=False))
+                template[sub_name] = subcomponent
+            self._subcomponent_template = template
+        return self._subcomponent_template
+
     def get_primitive_type(self):
         return self._primitive_type
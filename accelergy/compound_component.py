@@ -18,9 +18,9 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
-from copy import deepcopy
 from accelergy.parsing_utils import *
 from accelergy.component_class import ComponentClass
+from accelergy.plug_in_interface.interface import canonicalize_query_value
 
 class CompoundComponent:
     def __init__(self, def_info):
@@ -37,8 +37,32 @@ class CompoundComponent:
         self.all_possible_subcomponents = {}
         self.subcomponent_base_name_map = {}
         self._actions = []
-        self.set_subcomponents(cc_classes, pc_classes)
-        self.flatten_action_list(cc_classes)
+        # Instances of a class with the same attributes and area share flatten the same way
+        component_class = cc_classes[self.class_name]
+        signature = (CompoundComponent.get_attribute_signature(self.attributes),
+                     canonicalize_query_value(self.area_share))
+        flattened = component_class.flattened_instances.get(signature, None)
+        if flattened is None:
+            self.set_subcomponents(cc_classes, pc_classes)
+            self.flatten_action_list(cc_classes)
+            component_class.flattened_instances[signature] = self
+        else:
+            self.reuse_flattened(flattened)
+
+    @staticmethod
+    def get_attribute_signature(attributes):
+        """ Hashable form of attributes. Types are kept, as they can change the outputs. """
+        return tuple((k, type(v), canonicalize_query_value(v)) for k, v in attributes.items())
+
+    def reuse_flattened(self, other):
+        """ Shares the subcomponents and actions of an identically defined component """
+        self._subcomponents = other._subcomponents
+        self._actions = other._actions
+        self.all_possible_subcomponents = {self.name: self}
+        for subname, subcomponent in other.all_possible_subcomponents.items():
+            if subcomponent is not other:
+                self.all_possible_subcomponents[subname] = subcomponent
+        self.construct_name_base_name_map()
 
     def get_class_name(self):
         return self.class_name
@@ -71,7 +95,8 @@ class CompoundComponent:
         list_of_primitive_components = []
         component_class = cc_classes[component.get_class_name()]
         compound_attributes = component.get_attributes()
-        subcomponents = deepcopy(component_class.get_subcomponents_as_dict())
+        subcomponents = OrderedDict((sub_name, subcomponent.copy()) for sub_name, subcomponent
+                                    in component_class.get_subcomponent_template().items())
         for default_sub_name, subcomponent in subcomponents.items():
             defined_sub_name = CompoundComponent.define_subcomponent_name(default_sub_name, compound_attributes)
             subcomponent.set_name(defined_sub_name)
@@ -117,7 +142,7 @@ class CompoundComponent:
             primitive_list = self.flatten_action_list_for_an_action(self.get_name(),
                                                                     top_level_action_list[action_idx],
                                                                     cc_classes)
-            top_level_action_list[action_idx].set_primitive_list(primitive_list)
+            top_level_action_list[action_idx] = top_level_action_list[action_idx].replace(primitive_list=primitive_list)
         self._actions = top_level_action_list
 
 
@@ -128,12 +153,12 @@ class CompoundComponent:
         # 3. define the range of the arguments of each subcomponent action
         # 4. if the action is a compound action -> go to 1
         #    if the action is a primitive action -> throw it in the list
-        action_copy = deepcopy(action)
-        subcomponent_actions = action_copy.get_subcomps() # subcomponent_name: list of action objects
+        subcomponent_actions = action.get_subcomps() # subcomponent_name: list of action objects
         compound_attributes = self.find_subcomponent_obj(component_name).get_attributes()
         compound_arguments = action.get_arguments()
-        aggregated_mappings = deepcopy(compound_attributes) if compound_arguments is None \
-                              else merge_dicts(compound_attributes, compound_arguments)
+        # only read, so the attributes are not copied
+        aggregated_mappings = compound_attributes if compound_arguments is None \
+                              else {**compound_attributes, **compound_arguments}
 
         action_share = action.get_action_share()
         if action_share is None:
@@ -153,8 +178,8 @@ class CompoundComponent:
                 if subcomponent_class_type == 'primitive':
                     list_of_primitive_actions.append((defined_subcomp_name, subaction))
                 else:
-                    default_subcomp_actions = deepcopy(cc_classes[subclass_name].get_action(subaction.get_name()).get_subcomps())
-                    subaction.set_subcomps(default_subcomp_actions)
+                    default_subcomp_actions = cc_classes[subclass_name].get_action(subaction.get_name()).get_subcomps()
+                    subaction = subaction.replace(subcomponents=default_subcomp_actions)
                     new_list_of_primitive_actions = self.flatten_action_list_for_an_action(defined_subcomp_name, subaction, cc_classes)
                     for new_primitive_action in new_list_of_primitive_actions:
                         list_of_primitive_actions.append(new_primitive_action)
@@ -165,12 +190,12 @@ class CompoundComponent:
         defined_subactions = []
         for subaction in subactions:
             parsed_action_share = CompoundComponent.parse_action_share(subaction, aggregated_dict)
-            subaction.set_action_share(parsed_action_share * upper_level_action_share)
-            if subaction.get_arguments() is not None:
-                for subarg_name, subarg_val in subaction.get_arguments().items():
-                    v = parse_expression_for_arithmetic(subarg_val, aggregated_dict, f'action {subaction.get_name()}', strings_allowed=False)
-                    subaction.set_argument({subarg_name: v})
-            defined_subactions.append(subaction)
+            arguments = subaction.get_arguments()
+            if arguments is not None:
+                arguments = {subarg_name: parse_expression_for_arithmetic(subarg_val, aggregated_dict, f'action {subaction.get_name()}', strings_allowed=False)
+                             for subarg_name, subarg_val in arguments.items()}
+            defined_subactions.append(subaction.replace(action_share=parsed_action_share * upper_level_action_share,
+                                                        arguments=arguments))
         return defined_subactions
 
     @staticmethod
@@ -194,7 +219,7 @@ class CompoundComponent:
         actionNameList = component_class.get_action_name_list()
         flattenedActionList = []
         for actionName in actionNameList:
-            actionObj = deepcopy(component_class.get_action(actionName))
+            actionObj = component_class.get_action(actionName)
             flattened = actionObj.flatten_action_args_into_list(self.attributes)
             for action in flattened:
                 flattenedActionList.append(action)
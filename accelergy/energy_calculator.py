@@ -21,12 +21,16 @@
 from collections import OrderedDict
 from accelergy.utils.utils import *
 
+try:
+    import numpy as np
+except ImportError:  # EnergyEvaluator falls back to Python loops without NumPy
+    np = None
+
 class EnergyCalculator:
     def __init__(self, info):
         self.action_counts = info['action_counts']
         self.parser_version = info['parser_version']
         self.ERT = info['ERT']
-        self.base_name_map = {} # map base names to ERT entries
         self.energy_estimates = None
         self.calculate_energy_estimates()
 
@@ -36,14 +40,86 @@ class EnergyCalculator:
         total_design_energy = 0
         for component_name, action_counts_obj_list in self.action_counts.get_action_counts().items():
             component_energy = 0
-            ERT_entry_obj = self.ERT.get_ERT_entry(component_name)
             for action_count_obj in action_counts_obj_list:
-                energy_per_action = ERT_entry_obj.get_action_energy(action_count_obj)
+                energy_per_action = self.ERT.get_action_energy(component_name, action_count_obj)
                 component_energy = component_energy + energy_per_action * action_count_obj.get_action_count()
             energy_estimates[component_name] = component_energy
             total_design_energy += component_energy
         self.energy_estimates = EnergyEstimates(energy_estimates, total_design_energy, self.parser_version)
 
+class EnergyEvaluator:
+    """
+    An ERT compiled into a fixed layout of (component name, action name, arguments) columns, for
+    callers that evaluate many sets of action counts (e.g. mappers) without writing them to YAML.
+
+    evaluate() takes a vector of counts, one per column, or a matrix with one such vector per row,
+    and returns the total energy and the energy of each ERT component (in the order of
+    component_names). Use get_column() or get_counts_vector() to lay out the counts. Columns are
+    found as ERT.get_action_energy finds energies, so both give the same results. Without NumPy,
+    counts are lists and energies are summed in Python.
+    """
+    def __init__(self, ERT):
+        self.ERT = ERT
+        self.component_names = list(ERT.entries)
+        self.columns = []
+        # (ERT entry name, action name, position of the argument combination) -> column
+        self.column_index = {}
+        self.energies = []
+        self.column_components = []
+        # Columns are grouped by component. Start of each group, and its component.
+        self.segment_starts = []
+        self.segment_components = []
+        for component_idx, (component_name, ERT_entry) in enumerate(ERT.entries.items()):
+            if ERT.get_base_name_map()[remove_brackets(component_name)] != component_name:
+                continue  # lookups use the last entry with a base name, as in the ERT
+            if any(ERT_entry.action_entries.values()):
+                self.segment_starts.append(len(self.columns))
+                self.segment_components.append(component_idx)
+            for action_name, action_info_list in ERT_entry.action_entries.items():
+                for position, arg_combo in enumerate(action_info_list):
+                    self.column_index[(component_name, action_name, position)] = len(self.columns)
+                    self.columns.append((component_name, action_name, arg_combo['arguments']))
+                    self.column_components.append(component_idx)
+                    self.energies.append(arg_combo['energy'])
+        if np is not None:
+            self.energies = np.array(self.energies, dtype=float)
+
+    def get_column(self, component_name, action_name, arguments=None):
+        """ Column of an action. Component names may be given with an index within their ERT range. """
+        ERT_entry = self.ERT.get_ERT_entry(component_name)
+        position = ERT_entry.find_combination(action_name, arguments)
+        return self.column_index[(ERT_entry.get_component_name(), action_name, position)]
+
+    def get_counts_vector(self, action_counts):
+        """ Lays out the counts of an ActionCounts object """
+        counts = [0] * len(self.columns)
+        for component_name, action_counts_obj_list in action_counts.get_action_counts().items():
+            for action_count_obj in action_counts_obj_list:
+                column = self.get_column(component_name, action_count_obj.get_action_name(),
+                                         action_count_obj.get_action_args())
+                counts[column] += action_count_obj.get_action_count()
+        return np.array(counts, dtype=float) if np is not None else counts
+
+    def evaluate(self, counts):
+        """
+        Returns (total energy, energy of each component) for a vector of counts, or
+        (vector of totals, matrix of component energies) for a matrix with one set of counts per row.
+        """
+        if np is not None:
+            column_energies = np.asarray(counts, dtype=float) * self.energies
+            component_energies = np.zeros(column_energies.shape[:-1] + (len(self.component_names),))
+            if self.segment_starts:
+                component_energies[..., self.segment_components] = np.add.reduceat(
+                    column_energies, self.segment_starts, axis=-1)
+            return column_energies.sum(axis=-1), component_energies
+        if counts and isinstance(counts[0], (list, tuple)):
+            return tuple(list(r) for r in zip(*(self.evaluate(row) for row in counts)))
+        component_energies = [0] * len(self.component_names)
+        for count, energy, component_idx in zip(counts, self.energies, self.column_components):
+            component_energies[component_idx] += count * energy
+        return sum(component_energies), component_energies
+
+
 class EnergyEstimates:
     def __init__(self, estimates_dict, total_design_energy, parser_version):
         self.energy_estimates_dict = estimates_dict
@@ -25,6 +25,8 @@ from accelergy.utils.utils import *
 import pyfiglet
 import sys
 from accelergy.utils.yaml import write_yaml_file
+from accelergy.plug_in_interface.estimation_cache import DEFAULT_CACHE_SIZE_MB
+from accelergy.plug_in_interface.query_plug_ins import MAX_ACCURACY
 
 def parse_commandline_args():
     ascii_banner = pyfiglet.figlet_format("Accelergy")
@@ -75,6 +77,42 @@ def parse_commandline_args():
     parser.add_argument('--update_config_version', action='store_true', default=False,
                         help='Update the Accelergy config file ' \
                              '(usually ~/.config/accelergy/accelergy_config.yaml) to the latest version.')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='Number of processes used to parse input files and to query plug-ins when '
+                             'generating the ERT and ART. '
+                             'Outputs are identical to a run with one job. Default is 1.')
+    parser.add_argument('--concurrency', type=int, default=1,
+                        help='Maximum number of plug-in calls in flight at once in each job. Async '
+                             'plug-ins are awaited concurrently and other plug-ins are called from a '
+                             'thread pool. Default is 1.')
+    parser.add_argument('--accuracy_ceiling', type=float, default=MAX_ACCURACY,
+                        help='Stop checking plug-ins for a component once one reports at least this '
+                             'percent accuracy. Plug-ins at or above the ceiling are treated as equally '
+                             'accurate, so the first is used. Default is %d, which never changes the '
+                             'selected plug-in.' % MAX_ACCURACY)
+    parser.add_argument('--profile_plugins', action='store_true', default=False,
+                        help='Time every plug-in call and write the count, total, p50/p95/max time, and '
+                             'repeated-query rate per plug-in, method, and component class to '
+                             'plugin_profile.yaml.')
+    parser.add_argument('--query_timeout', type=float, default=None,
+                        help='Maximum seconds for each plug-in call. A call that takes longer is treated '
+                             'as a failure, and the next most accurate plug-in is used. Default is no limit.')
+    parser.add_argument('--estimation_budget', type=float, default=None,
+                        help='Maximum seconds for all plug-in calls together. Once it is used up, every '
+                             'remaining plug-in call fails. Default is no limit.')
+    parser.add_argument('--cache_estimations', action='store_true', default=False,
+                        help='Store plug-in estimations in an on-disk cache and reuse them in later runs. '
+                             'Cached estimations are invalidated when any plug-in changes.')
+    parser.add_argument('--cache_dir', type=str, default=None,
+                        help='Directory for the estimation cache. Default is '
+                             '$XDG_CACHE_HOME/accelergy/estimations (usually ~/.cache/accelergy/estimations).')
+    parser.add_argument('--cache_size', type=float, default=DEFAULT_CACHE_SIZE_MB,
+                        help='Maximum size of the estimation cache in MB. Least-recently-used entries '
+                             'are evicted past this size. Default is %d.' % DEFAULT_CACHE_SIZE_MB)
+    parser.add_argument('--cache_inputs', action='store_true', default=False,
+                        help='Store parsed input files and component libraries in an on-disk cache at '
+                             '$XDG_CACHE_HOME/accelergy/parsed and reuse them in later runs. A file is '
+                             'parsed again when it or any file that it includes changes.')
     return parser.parse_args()
 
 
@@ -149,3 +187,8 @@ def generate_output_files(system_state):
             path = os.path.join(output_path, output_prefix + 'ART_summary_verbose.yaml')
             write_yaml_file(path, system_state.ART.get_ART_summary_verbose())
             INFO('verbose area reference table summary is saved to:', path)
+
+    if system_state.plug_in_profiler is not None:
+        path = os.path.join(output_path, output_prefix + 'plugin_profile.yaml')
+        write_yaml_file(path, system_state.plug_in_profiler.get_report())
+        INFO('plug-in profile is saved to:', path)
@@ -19,16 +19,25 @@
 # SOFTWARE.
 
 import copy
+import functools
+from collections import ChainMap, OrderedDict
+from collections.abc import Mapping
 from importlib.machinery import SourceFileLoader
 import math
 import re
 import traceback
-from typing import Any, Union
+from types import CodeType
+from typing import Any, Dict, FrozenSet, Iterator, List, Set, Tuple, Union
 from accelergy.utils.utils import *
 from numbers import Number
 import accelergy.version as version
 import ruamel.yaml
 
+try:
+    import numpy as np
+except ImportError:  # Sweeps are only available with NumPy
+    np = None
+
 MATH_FUNCS = {
     "ceil": math.ceil,
     "comb": math.comb,
@@ -102,8 +111,88 @@ MATH_FUNCS = {
     "enumerate": enumerate,
 }
 SCRIPT_FUNCS = {}
-EXPR_CACHE = {}
-PARSED_EXPRESSIONS = set()
+# Maximum number of entries in each cache below
+PARSING_CACHE_SIZE = 2 ** 16
+
+
+class BoundedCache(OrderedDict):
+    """Dictionary that drops its oldest entries once it holds more than max_size."""
+
+    def __init__(self, max_size: int):
+        super().__init__()
+        self.max_size = max_size
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        if len(self) > self.max_size:
+            self.popitem(last=False)
+
+
+class ParsedValues:
+    """
+    Values returned by parse_expression_for_arithmetic that must be returned unchanged if they
+    are parsed again, such as 2.0 from "4 / 2" (which would otherwise be cast to 2) and quoted
+    strings. A reference to each value is kept, so its id can't be reused by another object
+    while it is recorded.
+
+    Values are never evicted, since a value that is still in use would then be parsed differently
+    depending on how many values came after it. Instead, they are kept for one parsing session
+    and forgotten by reset_parsing_state() at the start of each run.
+    """
+
+    def __init__(self):
+        self.values = {}
+
+    def add(self, value: Any):
+        self.values[id(value)] = value
+
+    def __contains__(self, value: Any) -> bool:
+        return self.values.get(id(value), None) is value
+
+    def clear(self):
+        self.values.clear()
+
+
+# Expression string -> last value, to log each calculation only when its value changes
+EXPR_CACHE = BoundedCache(PARSING_CACHE_SIZE)
+PARSED_VALUES = ParsedValues()
+
+
+def build_expression_globals() -> dict:
+    """Globals that expressions are evaluated with. Rebuilt when script functions are added."""
+    expression_globals = {"__builtins__": None}  # Safety
+    expression_globals.update(SCRIPT_FUNCS)
+    expression_globals.update(MATH_FUNCS)
+    return expression_globals
+
+
+def elementwise(func):
+    """func applied to sweep columns point by point, with the same semantics as for scalars."""
+
+    def apply(*args):
+        return np.frompyfunc(func, len(args), 1)(*args)
+
+    return apply
+
+
+if np is not None:
+    # MATH_FUNCS applied point by point. Strings are only made by scalar evaluation, which quotes
+    # them, and script functions are not available over sweep columns, so expressions that use
+    # them are evaluated one point at a time.
+    SWEEP_GLOBALS = {"__builtins__": None}  # Safety
+    for name, func in MATH_FUNCS.items():
+        if not callable(func):
+            SWEEP_GLOBALS[name] = func
+        elif func is not str:
+            SWEEP_GLOBALS[name] = elementwise(func)
+
+
+EXPRESSION_GLOBALS = build_expression_globals()
+# Expression string -> (code object, names that the expression may refer to)
+COMPILED_EXPRESSIONS = BoundedCache(PARSING_CACHE_SIZE)
+# String -> value if cast_to_numeric accepts it, else NOT_A_LITERAL
+LITERALS = BoundedCache(PARSING_CACHE_SIZE)
+NOT_A_LITERAL = object()
 
 
 def interpret_component_list(name, binding_dictionary=None):
@@ -178,18 +267,123 @@ def cast_to_numeric(x: Any) -> Union[int, float, bool]:
     return float(x)
 
 
-QUOTED_STRINGS = set()
+def parse_literal(expression: str) -> Any:
+    """
+    Returns cast_to_numeric(expression), or NOT_A_LITERAL if it raises. Identifiers other than
+    true and false are never numeric, so they skip the cast and its exception.
+    """
+    value = LITERALS.get(expression, None)
+    if value is None:
+        if expression.isidentifier() and expression.lower() not in ("true", "false"):
+            value = NOT_A_LITERAL
+        else:
+            try:
+                value = cast_to_numeric(expression)
+            except:
+                value = NOT_A_LITERAL
+        LITERALS[expression] = value
+    return value
 
 
-def is_quoted_string(expression):
-    return (
-        isinstance(
-            expression, ruamel.yaml.scalarstring.DoubleQuotedScalarString
+def get_code_names(code: CodeType) -> Iterator[str]:
+    """Names used by a code object and the code objects nested in it (e.g. comprehensions)."""
+    yield from code.co_names
+    for const in code.co_consts:
+        if isinstance(const, CodeType):
+            yield from get_code_names(const)
+
+
+def compile_expression(expression: str) -> Tuple[CodeType, FrozenSet[str]]:
+    """
+    Returns the compiled expression and the names that it may refer to. Each expression is
+    compiled once.
+    """
+    compiled = COMPILED_EXPRESSIONS.get(expression, None)
+    if compiled is None:
+        # Like eval(), ignore leading spaces and tabs
+        code = compile(expression.lstrip(" \t"), "<string>", "eval", dont_inherit=True)
+        compiled = (code, frozenset(get_code_names(code)))
+        COMPILED_EXPRESSIONS[expression] = compiled
+    return compiled
+
+
+def is_sweep(value: Any) -> bool:
+    """Sweep columns are NumPy arrays with one value per design point."""
+    return np is not None and isinstance(value, np.ndarray)
+
+
+def get_sweep_names(names: FrozenSet[str], binding_dictionary: Mapping) -> List[str]:
+    if np is None or not binding_dictionary:
+        return []
+    return [n for n in names if is_sweep(binding_dictionary.get(n, None))]
+
+
+def evaluate_sweep(
+    expression: str,
+    binding_dictionary: Mapping,
+    sweep_names: List[str],
+    location: str,
+    strings_allowed: bool,
+) -> Any:
+    """
+    Evaluates an expression that refers to sweep columns, giving a column of results. The
+    expression is evaluated once over the whole columns if it can be. Otherwise (for example, if
+    it branches on a swept value or calls a script function), it is parsed once per point.
+
+    Columns are evaluated as object arrays of Python numbers, so every point is computed exactly
+    as scalar evaluation would compute it. In particular, integers can't overflow as NumPy's
+    fixed-width integers would.
+    """
+    lengths = {len(binding_dictionary[n]) for n in sweep_names}
+    ASSERT_MSG(
+        len(lengths) == 1,
+        f"{location}: sweep variables {', '.join(sweep_names)} have different lengths.",
+    )
+    length = lengths.pop()
+    points = {n: binding_dictionary[n].tolist() for n in sweep_names}
+    try:
+        columns = {n: np.array(points[n], dtype=object) for n in sweep_names}
+        v = eval(
+            compile_expression(expression)[0],
+            SWEEP_GLOBALS,
+            ChainMap(columns, binding_dictionary),
         )
-        or isinstance(
-            expression, ruamel.yaml.scalarstring.SingleQuotedScalarString
+        if is_sweep(v) and v.shape == (length,):
+            return v
+    except Exception:
+        pass
+    v = np.empty(length, dtype=object)
+    for i in range(length):
+        v[i] = parse_expression_for_arithmetic(
+            expression,
+            ChainMap({n: points[n][i] for n in sweep_names}, binding_dictionary),
+            f"{location}[{i}]",
+            strings_allowed,
         )
-        or id(expression) in QUOTED_STRINGS
+    return v
+
+
+def values_differ(a: Any, b: Any) -> bool:
+    if is_sweep(a) or is_sweep(b):
+        return not (is_sweep(a) and is_sweep(b) and np.array_equal(a, b))
+    return a != b
+
+
+def reset_parsing_state():
+    """
+    Starts a new parsing session, forgetting values parsed earlier so that every run in a process
+    parses the same way. Embedding applications should call this before each run.
+    """
+    EXPR_CACHE.clear()
+    PARSED_VALUES.clear()
+    ComponentName.get.cache_clear()
+
+
+def is_quoted_string(expression):
+    return isinstance(
+        expression, ruamel.yaml.scalarstring.DoubleQuotedScalarString
+    ) or isinstance(
+        expression, ruamel.yaml.scalarstring.SingleQuotedScalarString
     )
 
 
@@ -202,42 +396,35 @@ def parse_expression_for_arithmetic(
     binding_dictionary,
     location: str,
     strings_allowed: bool = True,
-    use_bindings_after: str = None,
 ):
-    if (
-        strings_allowed
-        and is_quoted_string(expression)
-        or id(expression) in QUOTED_STRINGS
-    ):
-        QUOTED_STRINGS.add(id(expression))
+    if expression in PARSED_VALUES:
         return expression
 
-    if id(expression) in PARSED_EXPRESSIONS:
+    if strings_allowed and is_quoted_string(expression):
+        PARSED_VALUES.add(expression)
         return expression
 
-    try:
-        return cast_to_numeric(expression)
-    except:
-        pass
-
     if not isinstance(expression, str):
-        return expression
-
-    if use_bindings_after is not None:
-        keys = list(binding_dictionary.keys())
-        index = keys.index(use_bindings_after)
-        if index != -1:
-            keys = keys[:index]
-            binding_dictionary = {k: binding_dictionary[k] for k in keys}
+        if is_sweep(expression):
+            return expression
+        try:
+            return cast_to_numeric(expression)
+        except:
+            return expression
 
-    FUNCTION_BINDINGS = {}
-    FUNCTION_BINDINGS["__builtins__"] = None  # Safety
-    FUNCTION_BINDINGS.update(SCRIPT_FUNCS)
-    FUNCTION_BINDINGS.update(MATH_FUNCS)
+    literal = parse_literal(expression)
+    if literal is not NOT_A_LITERAL:
+        return literal
 
     try:
-        v = eval(expression, FUNCTION_BINDINGS, binding_dictionary)
-        infostr = f'Calculated {location} as "{expression}" = {v}'
+        code, names = compile_expression(expression)
+        sweep_names = get_sweep_names(names, binding_dictionary)
+        if sweep_names:
+            v = evaluate_sweep(
+                expression, binding_dictionary, sweep_names, location, strings_allowed
+            )
+        else:
+            v = eval(code, EXPRESSION_GLOBALS, binding_dictionary)
         if isinstance(v, str):
             v = ruamel.yaml.scalarstring.DoubleQuotedScalarString(v)
         success = True
@@ -248,7 +435,7 @@ def parse_expression_for_arithmetic(
             isinstance(expression, str)
             and expression.isidentifier()
             and expression not in binding_dictionary
-            and expression not in FUNCTION_BINDINGS
+            and expression not in EXPRESSION_GLOBALS
         ):
             e = NameError(f"Name '{expression}' is not defined.")
         errstr += f"Problem encountered: {e.__class__.__name__}: {e}\n"
@@ -280,99 +467,160 @@ def parse_expression_for_arithmetic(
             return expression
         ERROR_CLEAN_EXIT(f"{errstr}\n")
 
-    if expression not in EXPR_CACHE or EXPR_CACHE[expression] != v:
-        INFO(infostr)
+    if expression not in EXPR_CACHE or values_differ(EXPR_CACHE[expression], v):
+        INFO(f'Calculated {location} as "{expression}" = {v}')
 
     EXPR_CACHE[expression] = v
-    PARSED_EXPRESSIONS.add(id(v))
+    if not isinstance(v, int):  # Ints are unchanged by parsing again
+        PARSED_VALUES.add(v)
     return v
 
 
+def fold_constant(expression: Any, location: str, strings_allowed: bool = True) -> Any:
+    """
+    Returns the parsed value of an expression that does not depend on any bindings (e.g.
+    "2 * 1024") if parsing that value again gives the same value. Otherwise, returns the
+    expression unchanged.
+    """
+    if not isinstance(expression, str) or strings_allowed and is_quoted_string(expression):
+        return expression
+    if parse_literal(expression) is NOT_A_LITERAL:
+        try:
+            if compile_expression(expression)[1]:
+                return expression
+        except Exception:
+            return expression  # Reported when the expression is parsed
+    v = parse_expression_for_arithmetic(expression, {}, location, strings_allowed)
+    if type(v) in (int, bool) or type(v) is float and not v.is_integer():
+        return v
+    return expression
+
+
+def get_expression_names(expression: Any, strings_allowed: bool = True) -> FrozenSet[str]:
+    """Names that parse_expression_for_arithmetic may look up to parse an expression."""
+    if (
+        not isinstance(expression, str)
+        or expression in PARSED_VALUES
+        or strings_allowed
+        and is_quoted_string(expression)
+        or parse_literal(expression) is not NOT_A_LITERAL
+    ):
+        return frozenset()
+    try:
+        return compile_expression(expression)[1]
+    except Exception:
+        return frozenset()  # Reported when the expression is evaluated
+
+
+class VisibleValues(Mapping):
+    """
+    Parsed values that one expression may see: those of the keys before it and of the later keys
+    that it refers to. A view, so that no bindings are copied per expression.
+    """
+
+    def __init__(
+        self,
+        parsed: Dict[str, Any],
+        keys: List[str],
+        index: Dict[str, int],
+        position: int,
+        forward: Set[str],
+    ):
+        self.parsed = parsed
+        self.keys = keys
+        self.index = index
+        self.position = position
+        self.forward = forward
+
+    def __getitem__(self, key):
+        if key in self.parsed and (
+            self.index[key] < self.position or key in self.forward
+        ):
+            return self.parsed[key]
+        raise KeyError(key)
+
+    def __iter__(self):
+        for k in self.keys[: self.position]:
+            if k in self.parsed:
+                yield k
+        yield from self.forward
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+
 def parse_expressions_sequentially_replacing_bindings(
     expression_dictionary: dict,
     binding_dictionary: dict,
     location: str,
     strings_allowed: bool = True,
+    parse_non_strings: bool = True,
 ):
+    """
+    Parses each value of expression_dictionary. Each expression sees the bindings and the parsed
+    values of the keys before it, which replace bindings of the same name. An expression may also
+    refer to a later key whose name is not otherwise defined; that key is parsed first. The names
+    in each expression are found once, and a circular reference is an error. If parse_non_strings
+    is False, values that are not strings are kept as they are (e.g. 3.0 is not cast to 3).
+    """
+    keys = list(expression_dictionary.keys())
+    index = {k: i for i, k in enumerate(keys)}
     parsed = {}
-    for k, v in expression_dictionary.items():
-        attrs = {k: v for k, v in binding_dictionary.items()}
-        attrs.update(parsed)
-        parsed[k] = parse_expression_for_arithmetic(
-            v, attrs, f'{location}"{k}"', strings_allowed
+    in_progress = []
+
+    def parse(k):
+        position = index[k]
+        expression = expression_dictionary[k]
+        in_progress.append(k)
+        forward = set()
+        for name in get_expression_names(expression, strings_allowed):
+            name_position = index.get(name, position)
+            # Later keys are only used for names that would otherwise be undefined
+            if name_position == position or name_position > position and (
+                name in binding_dictionary or name in EXPRESSION_GLOBALS
+            ):
+                continue
+            if name in in_progress:
+                cycle = in_progress[in_progress.index(name):] + [name]
+                ERROR_CLEAN_EXIT(
+                    "Circular reference: "
+                    + " -> ".join(f'{location}"{c}"' for c in cycle)
+                )
+            if name not in parsed:
+                parse(name)
+            if name_position > position:
+                forward.add(name)
+        scope = ChainMap(
+            VisibleValues(parsed, keys, index, position, forward),
+            binding_dictionary,
         )
-    return parsed
+        if parse_non_strings or isinstance(expression, str):
+            expression = parse_expression_for_arithmetic(
+                expression, scope, f'{location}"{k}"', strings_allowed
+            )
+        parsed[k] = expression
+        in_progress.pop()
+
+    for k in keys:
+        if k not in parsed:
+            parse(k)
+    return {k: parsed[k] for k in keys}
 
 
 def count_num_identical_comps(name):
-    total_num_identical_comps = 1
-    start_idx = name.find("[")
-    end_idx = name.find("]")
-    potential_range = name[start_idx + 1: end_idx]
-    if ".." in potential_range:
-        range_start = int(potential_range.split("..")[0])
-        range_end = int(potential_range.split("..")[1])
-        range = range_end - range_start + 1
-        total_num_identical_comps = total_num_identical_comps * range
-    if "[" and "]" in name[end_idx + 1:]:
-        total_num_identical_comps = (
-            total_num_identical_comps
-            * count_num_identical_comps(name[end_idx + 1:])
-        )
-    return total_num_identical_comps
+    return ComponentName.get(name).multiplicity
 
 
 def comp_name_within_range(comp_name, comp_name_w_reference_range):
     """Check if the component name is legal according to the specified component names"""
-
-    if "[" not in comp_name:
-        return True
-    subname_vals_list = get_ranges_or_indices_in_name(comp_name)
-    reference_ranges_list = get_ranges_or_indices_in_name(
-        comp_name_w_reference_range
-    )
-    ASSERT_MSG(
-        len(reference_ranges_list) == len(subname_vals_list),
-        "subcomp name %s missing index specifications (should agree with the format %s"
-        % (comp_name, comp_name_w_reference_range),
+    return ComponentName.get(comp_name).within(
+        ComponentName.get(comp_name_w_reference_range)
     )
-    for idx in range(len(reference_ranges_list)):
-        ref_range_tupe = reference_ranges_list[idx]
-        ref_min = ref_range_tupe[0]
-        ref_max = ref_range_tupe[1]
-        subname_val = subname_vals_list[idx]
-        if isinstance(subname_val, int):
-            if subname_val < ref_min or subname_val > ref_max:
-                return False
-        if isinstance(subname_val, tuple):
-            start = subname_val[0]
-            end = subname_val[1]
-            if start < ref_min or end > ref_max:
-                return False
-    return True
 
 
 def get_ranges_or_indices_in_name(name):
-    """recursive function that eventually collects all the list ranges/list indices in the specified component name"""
-
-    exisiting_ranges = []
-    start_idx = name.find("[")
-    end_idx = name.find("]")
-    range = name[start_idx + 1: end_idx]
-    if ".." in range:
-        range_start = int(range.split("..")[0])
-        range_end = int(range.split("..")[1])
-        val = (range_start, range_end)
-    else:
-        val = int(range)
-    exisiting_ranges.append(val)
-    subname = name[end_idx + 1:]
-    if "[" and "]" not in subname:
-        return exisiting_ranges
-    else:
-        for val in get_ranges_or_indices_in_name(subname):
-            exisiting_ranges.append(val)
-    return exisiting_ranges
+    """collects all the list ranges/list indices in the specified component name"""
+    return list(ComponentName.get(name).indices)
 
 
 def set_script_paths(paths):
@@ -390,3 +638,5 @@ def set_script_paths(paths):
             INFO(f"Adding function {func} from {path} to the script library.")
             funcs[func] = getattr(python_module, func)
     SCRIPT_FUNCS.update(funcs)
+    global EXPRESSION_GLOBALS
+    EXPRESSION_GLOBALS = build_expression_globals()
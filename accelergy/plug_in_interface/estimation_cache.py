@@ -0,0 +1,246 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import accelergy.version as version
+from accelergy.plug_in_interface.interface import (
+    AccelergyPlugIn,
+    AccelergyQuery,
+    Estimation,
+    UnitOption,
+)
+from accelergy.plug_in_interface.estimator_wrapper import EstimatorWrapper
+from accelergy.plug_in_interface.query_plug_ins import MAX_ACCURACY, plugin2name
+from accelergy.utils.utils import INFO, WARN, create_folder, get_user_cache_dir
+
+DEFAULT_CACHE_SIZE_MB = 512
+# After an eviction, the cache is trimmed to this fraction of its maximum size so that we don't
+# evict again on the next write.
+EVICTION_LOW_WATERMARK = 0.9
+# Temporary files older than this (seconds) were left by a crashed process and may be deleted.
+STALE_TEMP_FILE_AGE = 3600
+TEMP_FILE_PREFIX = '.tmp-'
+
+SOURCE_HASHES = {}
+
+
+def get_source_file(cls: type) -> Optional[str]:
+    """
+    Returns the file that defines a class. Python plug-ins are all loaded under the same module
+    name, so the module's __file__ can't be trusted. Function code objects keep the real path.
+    """
+    for klass in cls.__mro__:
+        for v in vars(klass).values():
+            code = getattr(v, '__code__', None)
+            if code is not None:
+                return code.co_filename
+    return None
+
+
+def hash_source_file(path: Optional[str]) -> str:
+    if path is None:
+        return ''
+    if path not in SOURCE_HASHES:
+        try:
+            with open(path, 'rb') as f:
+                SOURCE_HASHES[path] = hashlib.sha256(f.read()).hexdigest()
+        except OSError:
+            SOURCE_HASHES[path] = ''
+    return SOURCE_HASHES[path]
+
+
+def plug_in_is_deterministic(plug_in: Any) -> bool:
+    if isinstance(plug_in, AccelergyPlugIn):
+        return plug_in.is_deterministic()
+    return bool(getattr(plug_in, 'deterministic', True))
+
+
+def plug_in_fingerprint(plug_in: Any) -> Tuple[str, str, str]:
+    """ Returns the name, declared version, and source hash of a plug-in. """
+    if isinstance(plug_in, AccelergyPlugIn):
+        plug_in_version = plug_in.get_version()
+    else:
+        plug_in_version = getattr(plug_in, 'version', None)
+    source_cls = plug_in.estimator_cls if isinstance(plug_in, EstimatorWrapper) else type(plug_in)
+    return (
+        plugin2name(plug_in),
+        str(plug_in_version) if plug_in_version is not None else '',
+        hash_source_file(get_source_file(source_cls)),
+    )
+
+
+def estimation_to_dict(estimation: Estimation) -> Dict[str, Any]:
+    value = estimation.value
+    if not isinstance(value, (int, float)):
+        value = float(value)
+    return {
+        'value': value,
+        'unit': estimation.unit.name,
+        'estimator_name': estimation.estimator_name,
+        'messages': [str(m) for m in estimation.messages],
+    }
+
+
+def dict_to_estimation(d: Dict[str, Any]) -> Estimation:
+    estimation = Estimation(d['value'], unit=UnitOption[d['unit']])
+    estimation.estimator_name = d['estimator_name']
+    estimation.add_messages(list(d['messages']))
+    return estimation
+
+
+class EstimationCache:
+    """
+    Content-addressed on-disk cache of plug-in estimations, shared between Accelergy runs.
+
+    An entry is keyed on the query (class name, attributes, action name, arguments), whether it
+    is an energy or area estimation, and the name, version, and source hash of every loaded
+    plug-in. Adding, removing, or editing a plug-in therefore invalidates the entries that it may
+    have affected. The accuracy ceiling is part of the key because it can change which plug-in
+    is selected. Estimations made by non-deterministic plug-ins are never stored.
+
+    Each entry is its own file and is written atomically (write to a temporary file, then rename),
+    so any number of Accelergy processes may share a cache directory. Entries are touched when
+    they are read, and the least-recently-used entries are evicted when the cache grows past its
+    size cap.
+    """
+
+    def __init__(
+        self,
+        plug_ins: List[Any],
+        cache_dir: Optional[str] = None,
+        max_size_mb: float = DEFAULT_CACHE_SIZE_MB,
+        accuracy_ceiling: float = MAX_ACCURACY,
+    ):
+        self.cache_dir = os.path.abspath(os.path.expanduser(cache_dir or get_user_cache_dir('estimations')))
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024)
+        self.name2plug_in = {plugin2name(p): p for p in plug_ins}
+        self.plug_ins_fingerprint = tuple(sorted(plug_in_fingerprint(p) for p in plug_ins))
+        self.accuracy_ceiling = accuracy_ceiling
+        self._size_bytes = None
+        self.hits = 0
+        self.misses = 0
+        create_folder(self.cache_dir)
+        INFO(f'Using estimation cache at {self.cache_dir}')
+
+    def _get_key(self, query: AccelergyQuery, is_energy_estimation: bool) -> str:
+        key = (
+            version.__version__,
+            'energy' if is_energy_estimation else 'area',
+            query.get_canonical_key(),
+            self.plug_ins_fingerprint,
+            self.accuracy_ceiling,
+        )
+        return hashlib.sha256(repr(key).encode('utf-8')).hexdigest()
+
+    def _get_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key + '.json')
+
+    def get(
+        self, query: Union[AccelergyQuery, Dict[str, Any]], is_energy_estimation: bool
+    ) -> Optional[Estimation]:
+        """ Returns the cached estimation for a query, or None if there is none. """
+        if isinstance(query, dict):
+            query = AccelergyQuery.from_interface_dict(query)
+        path = self._get_path(self._get_key(query, is_energy_estimation))
+        try:
+            with open(path, 'r') as f:
+                estimation = dict_to_estimation(json.load(f))
+        except (OSError, ValueError, KeyError, TypeError):
+            # Missing, or written by an incompatible version. Either way, a miss.
+            self.misses += 1
+            return None
+        try:
+            os.utime(path)  # Mark as recently used
+        except OSError:
+            pass
+        self.hits += 1
+        return estimation
+
+    def put(
+        self,
+        query: Union[AccelergyQuery, Dict[str, Any]],
+        is_energy_estimation: bool,
+        estimation: Estimation,
+    ):
+        """
+        Stores an estimation if it succeeded, came from a deterministic plug-in, and no plug-in
+        timed out while making it.
+        """
+        if not estimation.success or estimation.timed_out:
+            return
+        plug_in = self.name2plug_in.get(estimation.estimator_name, None)
+        if plug_in is None or not plug_in_is_deterministic(plug_in):
+            return
+        if isinstance(query, dict):
+            query = AccelergyQuery.from_interface_dict(query)
+        path = self._get_path(self._get_key(query, is_energy_estimation))
+        tmp_path = None
+        try:
+            create_folder(os.path.dirname(path))
+            fd, tmp_path = tempfile.mkstemp(
+                dir=os.path.dirname(path), prefix=TEMP_FILE_PREFIX, suffix='.json'
+            )
+            with os.fdopen(fd, 'w') as f:
+                json.dump(estimation_to_dict(estimation), f)
+            size = os.path.getsize(tmp_path)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            if tmp_path is not None:
+                self._remove(tmp_path)
+            WARN(f'Could not write to estimation cache at {path}: {e}')
+            return
+
+        if self._size_bytes is None:
+            self._size_bytes = self._scan()[1]
+        else:
+            self._size_bytes += size
+        if self._size_bytes > self.max_size_bytes:
+            self.evict()
+
+    def _scan(self) -> Tuple[List[Tuple[float, int, str]], int]:
+        """ Returns (mtime, size, path) for every entry and the total size of all entries. """
+        entries, total = [], 0
+        now = time.time()
+        for subdir in os.scandir(self.cache_dir):
+            if not subdir.is_dir():
+                continue
+            for entry in os.scandir(subdir.path):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue  # Deleted by another process
+                if entry.name.startswith(TEMP_FILE_PREFIX):
+                    if now - stat.st_mtime > STALE_TEMP_FILE_AGE:
+                        self._remove(entry.path)
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        return entries, total
+
+    @staticmethod
+    def _remove(path: str) -> bool:
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
+
+    def evict(self):
+        """ Removes least-recently-used entries until the cache is under its size cap. """
+        entries, total = self._scan()
+        target = self.max_size_bytes * EVICTION_LOW_WATERMARK
+        for _, size, path in sorted(entries):
+            if total <= target:
+                break
+            # Whether we or a concurrent process removed it, it is gone
+            self._remove(path)
+            total -= size
+        self._size_bytes = total
+
+    def log_statistics(self):
+        INFO(
+            f'Estimation cache at {self.cache_dir}: {self.hits} hits, {self.misses} misses.'
+        )
@@ -12,10 +12,17 @@ class Estimator(ListLoggable, ABC):
     """ 
     Estimator base class. Estimator class must have "name" attribute, "percent_accuracy_0_to_100"
     attribute, and "get_area" method. Estimators may have any number of methods that are
-    decorated with @action2energy.
+    decorated with @action2energy. Estimators that may return different values for the same
+    query should set "deterministic" to False so their results are not cached between runs.
+    Estimators that set "reuse_instances" to True are initialized once for all queries with
+    the same attributes. Their actions must not change the estimator's state, and with
+    --concurrency, one instance may be used by several threads at once.
     """
     name: Union[str, List[str]] = None
     percent_accuracy_0_to_100: Number = None
+    deterministic: bool = True
+    version: str = None
+    reuse_instances: bool = False
 
     def __init__(self, name: str=None):
         super().__init__(name=name)
@@ -1,18 +1,28 @@
 import copy
 import inspect
 import logging
+import threading
+from collections import OrderedDict
 from numbers import Number
 from types import ModuleType
-from typing import Any, Callable, Dict, List, Optional, Set
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 from accelergy.utils.utils import INFO, WARN
 from accelergy.plug_in_interface.interface import (
     AccelergyPlugIn,
     AccelergyQuery,
     Estimation,
     AccuracyEstimation,
+    canonicalize_query_value,
 )
 from accelergy.plug_in_interface.estimator import Estimator
-from accelergy.utils.logging import move_queue_from_one_logger_to_another
+from accelergy.utils.logging import (
+    call_capturing_records,
+    move_queue_from_one_logger_to_another,
+    replay_records,
+)
+
+# Maximum number of initialized estimators kept by each EstimatorWrapper
+INSTANCE_POOL_SIZE = 64
 
 
 class CallableFunction:
@@ -46,6 +56,8 @@ class CallableFunction:
             self.function_name = force_name_override
         self.non_default_args = args[: len(args) - default_length]
         self.default_args = args[len(args) - default_length :]
+        self.accepted_args = frozenset(args)
+        self.filter_plans = {}
         self.logger = logger
 
     def get_error_message_for_name_match(
@@ -79,24 +91,37 @@ class CallableFunction:
             return arg_error
         return None
 
+    def get_filter_plan(
+        self, kwargs: dict
+    ) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+        """Returns the used and unused names of the given arguments."""
+        key = tuple(kwargs.keys())
+        plan = self.filter_plans.get(key)
+        if plan is None:
+            plan = (
+                tuple(k for k in key if k in self.accepted_args),
+                tuple(k for k in key if k not in self.accepted_args),
+            )
+            self.filter_plans[key] = plan
+        return plan
+
+    def filter_kwargs(self, kwargs: dict, class_name: str = "") -> dict:
+        """Returns the arguments that the function accepts. Warns about the rest."""
+        used, unused = self.get_filter_plan(kwargs)
+        if unused:
+            self.logger.warn(
+                f'Unused arguments ({", ".join(unused)}) provided for {class_name}.'
+                f'{self.function_name}. Arguments used: ({", ".join(used)})'
+            )
+        return {k: kwargs[k] for k in used}
+
     def call(
         self,
         kwargs: dict,
         class_name: str = "",
         call_function_on_object: object = None,
     ) -> Any:
-        kwags_included = {
-            k: v
-            for k, v in kwargs.items()
-            if k in self.non_default_args or k in self.default_args
-        }
-        unneeded_args = [k for k in kwargs.keys() if k not in kwags_included]
-        if unneeded_args:
-            self.logger.warn(
-                f'Unused arguments ({", ".join(unneeded_args)}) provided for {class_name}.'
-                f'{self.function_name}. Arguments used: ({", ".join(kwags_included.keys())})'
-            )
-
+        kwags_included = self.filter_kwargs(kwargs, class_name)
         if call_function_on_object is not None:
             return self.function(call_function_on_object, **kwags_included)
         return self.function(**kwags_included)
@@ -117,6 +142,9 @@ class EstimatorWrapper(AccelergyPlugIn):
         self.init_function = CallableFunction(
             estimator_cls, self.logger, is_init=True
         )
+        # Filtered init arguments -> (initialized estimator, records logged while initializing)
+        self.instance_pool = OrderedDict()
+        self.instance_pool_lock = threading.Lock()
 
         self.actions = [
             CallableFunction(getattr(estimator_cls, a), self.logger)
@@ -156,11 +184,39 @@ class EstimatorWrapper(AccelergyPlugIn):
             return False
         return True
 
-    def get_initialized_subclass(self, query: AccelergyQuery) -> Estimator:
-        subclass = self.init_function.call(query.class_attrs, self.class_name)
+    def init_subclass(self, kwargs: dict) -> Estimator:
+        subclass = self.init_function.function(**kwargs)
         subclass.__ListLoggable__init__()
         return subclass
 
+    def get_initialized_subclass(self, query: AccelergyQuery) -> Estimator:
+        """
+        Returns an estimator initialized with the query's attributes. Estimators that opt in with
+        "reuse_instances" are kept in an LRU pool keyed by the arguments they were initialized
+        with, so queries for the same primitive share one instance. Messages logged during
+        initialization are logged again on each reuse.
+        """
+        kwargs = self.init_function.filter_kwargs(
+            query.class_attrs, self.class_name
+        )
+        if not getattr(self.estimator_cls, "reuse_instances", False):
+            return self.init_subclass(kwargs)
+
+        key = canonicalize_query_value(kwargs)
+        with self.instance_pool_lock:
+            pooled = self.instance_pool.get(key)
+            if pooled is not None:
+                self.instance_pool.move_to_end(key)
+        if pooled is None:
+            pooled = call_capturing_records(self.init_subclass, kwargs)
+            with self.instance_pool_lock:
+                self.instance_pool[key] = pooled
+                while len(self.instance_pool) > INSTANCE_POOL_SIZE:
+                    self.instance_pool.popitem(last=False)
+        subclass, init_records = pooled
+        replay_records(init_records)
+        return subclass
+
     def get_matching_actions(
         self, query: AccelergyQuery
     ) -> List[CallableFunction]:
@@ -254,6 +310,17 @@ class EstimatorWrapper(AccelergyPlugIn):
     def get_name(self) -> str:
         return self.estimator_name
 
+    def get_supported_class_names(self) -> List[str]:
+        if isinstance(self.class_name, str):
+            return [self.class_name]
+        return list(self.class_name)
+
+    def is_deterministic(self) -> bool:
+        return bool(getattr(self.estimator_cls, "deterministic", True))
+
+    def get_version(self) -> Optional[str]:
+        return getattr(self.estimator_cls, "version", None)
+
 
 def get_all_estimators_in_module(
     module: ModuleType, plug_in_ids: Set
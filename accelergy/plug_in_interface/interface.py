@@ -107,6 +107,8 @@ class Estimation:
         self.messages = []
         self.estimator_name = None
         self.unit = unit
+        # True if a plug-in call timed out while making this estimation
+        self.timed_out = False
 
     def add_messages(self, messages: Union[List[str], str]):
         """ 
@@ -235,7 +237,35 @@ class AccelergyQuery():
             if not d['arguments']:
                 d['arguments'] = None
         return d
-            
+
+    def get_canonical_key(self) -> tuple:
+        """
+        Returns a hashable representation of the query. YAML scalar types are converted to their
+        plain Python equivalents and attribute/argument order is ignored, so two queries that any
+        plug-in would see as identical have equal keys.
+        """
+        return (
+            self.class_name,
+            canonicalize_query_value(self.class_attrs),
+            self.action_name,
+            canonicalize_query_value(self.action_args or {}),
+        )
+
+
+def canonicalize_query_value(value: Any) -> Any:
+    """ Recursively converts a query attribute/argument value to a hashable, order-free form. """
+    if isinstance(value, dict):
+        return tuple(sorted((str(k), canonicalize_query_value(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(canonicalize_query_value(v) for v in value)
+    # bool before int, since bool is a subclass of int. Types are kept so 1, 1.0, and True differ.
+    for t in (bool, int, float, str):
+        if isinstance(value, t):
+            return (t.__name__, t(value))
+    if value is None:
+        return None
+    return (type(value).__name__, repr(value))
+
 
 class AccelergyPlugIn(ListLoggable, ABC):
     def __AccelergyPlugIn__init__(self): # Do not override this method
@@ -281,3 +311,95 @@ class AccelergyPlugIn(ListLoggable, ABC):
         """
         Returns the name of the plug-in.
         """
+
+    def pre_call(self, method_name: str, query: Union[AccelergyQuery, List[AccelergyQuery]]):
+        """
+        Called before Accelergy calls one of the plug-in's accuracy or estimation methods. For
+        batch methods, query is the list of queries. Override to attach timers or other
+        instrumentation. Errors raised here are logged and otherwise ignored.
+        """
+
+    def post_call(self, method_name: str, query: Union[AccelergyQuery, List[AccelergyQuery]],
+                  result: Any, seconds: float):
+        """
+        Called after each call that pre_call was called for, including calls that raised. result
+        is the returned Estimation or list of Estimations, or None if the call raised. seconds is
+        the time taken by the call.
+        """
+
+    def primitive_action_supported_batch(
+            self, queries: List[AccelergyQuery]) -> List[AccuracyEstimation]:
+        """
+        Returns one AccuracyEstimation per query, in order. Plug-ins that can check many queries
+        at once (e.g. by vectorizing a table lookup) may override this. Accelergy calls the batch
+        methods instead of the single-query methods when they are overridden. If a batch method
+        raises, each of its queries is retried with the single-query method.
+        """
+        return [self.primitive_action_supported(q) for q in queries]
+
+    def estimate_energy_batch(self, queries: List[AccelergyQuery]) -> List[Estimation]:
+        """
+        Returns one energy Estimation per query, in order. See primitive_action_supported_batch.
+        """
+        return [self.estimate_energy(q) for q in queries]
+
+    def primitive_area_supported_batch(
+            self, queries: List[AccelergyQuery]) -> List[AccuracyEstimation]:
+        """
+        Returns one AccuracyEstimation per query, in order. See primitive_action_supported_batch.
+        """
+        return [self.primitive_area_supported(q) for q in queries]
+
+    def estimate_area_batch(self, queries: List[AccelergyQuery]) -> List[Estimation]:
+        """
+        Returns one area Estimation per query, in order. See primitive_action_supported_batch.
+        """
+        return [self.estimate_area(q) for q in queries]
+
+    def get_supported_class_names(self) -> Union[List[str], None]:
+        """
+        Returns the names of the classes that this plug-in may estimate, or None if it may estimate
+        any class. Plug-ins are not queried for classes that they do not list.
+        """
+        return None
+
+    def is_deterministic(self) -> bool:
+        """
+        Returns whether the plug-in always gives the same estimation for the same query. Plug-ins
+        that return False are never stored in the on-disk estimation cache.
+        """
+        return True
+
+    def get_version(self) -> Union[str, None]:
+        """
+        Returns a version string for the plug-in. Cached estimations are invalidated when the
+        version or the source file of the plug-in changes. Plug-ins that read external tables or
+        tools should change the version when those change.
+        """
+        return None
+
+
+class AsyncAccelergyPlugIn(AccelergyPlugIn):
+    """
+    An AccelergyPlugIn whose accuracy and estimation methods are coroutines. Use this for plug-ins
+    that spend most of their time waiting on external tools or files. When Accelergy is run with
+    --concurrency N, up to N accuracy checks and estimations are in flight at once. Otherwise, each
+    call is run to completion before the next.
+
+    Batch methods are not used for async plug-ins.
+    """
+    @abstractmethod
+    async def primitive_action_supported(self, query: AccelergyQuery) -> AccuracyEstimation:
+        """ See AccelergyPlugIn.primitive_action_supported. """
+
+    @abstractmethod
+    async def estimate_energy(self, query: AccelergyQuery) -> Estimation:
+        """ See AccelergyPlugIn.estimate_energy. """
+
+    @abstractmethod
+    async def primitive_area_supported(self, query: AccelergyQuery) -> AccuracyEstimation:
+        """ See AccelergyPlugIn.primitive_area_supported. """
+
+    @abstractmethod
+    async def estimate_area(self, query: AccelergyQuery) -> Estimation:
+        """ See AccelergyPlugIn.estimate_area. """
@@ -0,0 +1,106 @@
+import math
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from accelergy.plug_in_interface.interface import AccelergyQuery
+
+# The profiler that plug-in calls are recorded to, or None if profiling is off
+PROFILER = None
+
+
+def get_profiler() -> 'PlugInProfiler':
+    return PROFILER
+
+
+def set_profiler(profiler: 'PlugInProfiler'):
+    global PROFILER
+    PROFILER = profiler
+
+
+def percentile(sorted_values: List[float], percent: float) -> float:
+    """ Nearest-rank percentile of a sorted, non-empty list. """
+    rank = max(1, math.ceil(percent / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(records: List[Tuple[str, str, str, float, Any, Optional[str]]]) -> Dict[str, Any]:
+    """ Call count, time statistics, repeated-query rate, and timeouts of a group of calls. """
+    times = sorted(r[3] for r in records)
+    seen = set()
+    repeated = 0
+    for plug_in_name, _, method_name, _, query_key, _ in records:
+        key = (plug_in_name, method_name, query_key)
+        if key in seen:
+            repeated += 1
+        seen.add(key)
+    return OrderedDict([
+        ('count', len(records)),
+        ('total_s', round(sum(times), 6)),
+        ('p50_s', round(percentile(times, 50), 6)),
+        ('p95_s', round(percentile(times, 95), 6)),
+        ('max_s', round(times[-1], 6)),
+        ('repeated_queries', repeated),
+        ('repeated_query_rate', round(repeated / len(records), 4)),
+        ('timeouts', sum(r[5] is not None for r in records)),
+    ])
+
+
+def group_by(records: List[tuple], index: int) -> Dict[str, List[tuple]]:
+    """ Groups records by one field, slowest group first. """
+    groups = {}
+    for r in records:
+        groups.setdefault(r[index], []).append(r)
+    return OrderedDict(sorted(groups.items(), key=lambda kv: -sum(r[3] for r in kv[1])))
+
+
+class PlugInProfiler:
+    """
+    Records the time of every plug-in call. The report breaks calls down by plug-in, then by
+    plug-in method and by component class. A repeated query is a call to the same plug-in method
+    with a query that it has already been called with; a high rate means that the plug-in is doing
+    redundant work.
+
+    Calls to a batch method are recorded once per query, each with an equal share of the batch's
+    time. Calls that timed out are counted and listed with their queries.
+    """
+    def __init__(self):
+        # (plug-in name, class name, method name, seconds, canonical query key,
+        #  description of the query if the call timed out, else None)
+        self.records = []
+
+    def record(self, plug_in_name: str, method_name: str, queries: List[AccelergyQuery],
+               seconds: float, timed_out: bool = False):
+        for query in queries:
+            self.records.append((plug_in_name, query.class_name, method_name,
+                                 seconds / len(queries), query.get_canonical_key(),
+                                 str(query) if timed_out else None))
+
+    def pop_records(self, start: int = 0) -> List[tuple]:
+        """ Removes and returns the records from index start onward. """
+        records = self.records[start:]
+        del self.records[start:]
+        return records
+
+    def add_records(self, records: List[tuple]):
+        self.records += records
+
+    def get_report(self) -> Dict[str, Any]:
+        plug_ins = OrderedDict()
+        for plug_in_name, records in group_by(self.records, 0).items():
+            summary = summarize(records)
+            summary['methods'] = OrderedDict(
+                (method_name, summarize(r)) for method_name, r in group_by(records, 2).items())
+            summary['classes'] = OrderedDict()
+            for class_name, class_records in group_by(records, 1).items():
+                summary['classes'][class_name] = summarize(class_records)
+                summary['classes'][class_name]['methods'] = OrderedDict(
+                    (method_name, summarize(r))
+                    for method_name, r in group_by(class_records, 2).items())
+            plug_ins[plug_in_name] = summary
+
+        report = summarize(self.records) if self.records else OrderedDict([('count', 0)])
+        report['plug_ins'] = plug_ins
+        timed_out = [f'{r[0]} {r[2]}: {r[5]}' for r in self.records if r[5] is not None]
+        if timed_out:
+            report['timed_out_queries'] = timed_out
+        return {'plugin_profile': report}
@@ -1,9 +1,21 @@
-import logging
+import asyncio
 import copy
+import inspect
+import logging
+import time
+from numbers import Number
+from concurrent.futures import Executor, ThreadPoolExecutor
 from typing import Any, Callable, Dict, List, Tuple, Union
 from accelergy.plug_in_interface.interface import *
+from accelergy.plug_in_interface.estimator_wrapper import EstimatorWrapper
+from accelergy.plug_in_interface.plug_in_profiler import get_profiler
+from accelergy.plug_in_interface.watchdog import PlugInTimeoutError, watch, watch_async
 from accelergy.utils.utils import ERROR_CLEAN_EXIT, indent_list_text_block, WARN
-from accelergy.utils.logging import get_logger, pop_all_messages, print_messages, log_all_lines
+from accelergy.utils.logging import get_logger, pop_all_messages, print_messages, log_all_lines, \
+    call_capturing_messages, await_capturing_messages
+from accelergy.utils.parallel import map_in_process_pool
+
+MAX_ACCURACY = 100
 
 RAISED_WARNINGS_FOR_CLASSES = []
 
@@ -24,36 +36,99 @@ def plugin2name(plug_in: Any) -> str:
     return plug_in.estimator_name
 
 
+def call_hook(plug_in: Any, hook_name: str, *args):
+    if not isinstance(plug_in, AccelergyPlugIn):
+        return
+    try:
+        getattr(plug_in, hook_name)(*args)
+    except Exception as e:
+        plug_in.logger.error(f'{hook_name} failed with {type(e).__name__}: {e}')
+
+
+def start_call(plug_in: Any, method_name: str,
+               query: Union[AccelergyQuery, List[AccelergyQuery]]) -> float:
+    """ Runs the plug-in's pre-call hook and returns the start time of a call. """
+    call_hook(plug_in, 'pre_call', method_name, query)
+    return time.perf_counter()
+
+
+def end_call(plug_in: Any, method_name: str, query: Union[AccelergyQuery, List[AccelergyQuery]],
+             result: Any, start: float, error: Exception = None):
+    """ Runs the plug-in's post-call hook and records the call if profiling. """
+    seconds = time.perf_counter() - start
+    call_hook(plug_in, 'post_call', method_name, query, result, seconds)
+    timed_out = isinstance(error, PlugInTimeoutError)
+    if timed_out:
+        queried = f'{len(query)} queries' if isinstance(query, list) else query
+        WARN(f'{plugin2name(plug_in)} {method_name} timed out for {queried}. {error}')
+    profiler = get_profiler()
+    if profiler is not None:
+        queries = query if isinstance(query, list) else [query]
+        profiler.record(plugin2name(plug_in), method_name, queries, seconds, timed_out)
+
+
+def run_coroutine(coroutine: Any) -> Any:
+    """
+    Runs a coroutine to completion. If this thread is already running an event loop (e.g. when
+    Accelergy is used from Jupyter or another async host), runs it in a new loop on a helper thread.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coroutine).result()
+
+
+def run_to_completion(target_func: Callable, arg: Any) -> Any:
+    result = target_func(arg)
+    if inspect.isawaitable(result):
+        result = run_coroutine(result)
+    return result
+
+
 def call_plug_in(plug_in: Any, query: AccelergyQuery, target_func: Callable,
                  estimation_type: Union[Estimation, AccuracyEstimation]) -> Estimation:
     logger = get_logger(plugin2name(plug_in))
+    method_name = target_func.__name__
+    start = start_call(plug_in, method_name, query)
     try:
         # New interface
         if isinstance(plug_in, AccelergyPlugIn):
-            estimation = target_func(query)
+            estimation = watch(run_to_completion, target_func, query)
             logger = plug_in.logger
         # Deprecated interface
         else:
             warn_depreciation(plug_in)
             estimation = estimation_type(
-                target_func(query.to_legacy_interface_dict()))
+                watch(target_func, query.to_legacy_interface_dict()))
             if estimation.success and not isinstance(estimation, AccuracyEstimation):
                 estimation.unit = UnitOption.from_str('p')
     except Exception as e:
         # Error
         # if isinstance(e, TypeError):
         #     raise e
+        end_call(plug_in, method_name, query, None, start, e)
         estimation = estimation_type(0, success=False)
+        estimation.timed_out = isinstance(e, PlugInTimeoutError)
         logger.error(f'{type(e).__name__}: {e}')
+    else:
+        end_call(plug_in, method_name, query, estimation, start)
+
+    return check_estimation(plug_in, query, estimation, estimation_type, pop_all_messages(logger))
+
 
+def check_estimation(plug_in: Any, query: AccelergyQuery, estimation: Estimation,
+                     estimation_type: Union[Estimation, AccuracyEstimation],
+                     messages: List[str]) -> Estimation:
     if not isinstance(estimation, estimation_type):
         raise TypeError(
             f'Plug-in {plugin2name(plug_in)} returned {type(estimation)} instead of '
             f'{estimation_type}. '
-            f'{indent_list_text_block("Messages:", pop_all_messages(plugin2name(plug_in)))}')
+            f'{indent_list_text_block("Messages:", messages)}')
 
     # Add message logs
-    estimation.add_messages(pop_all_messages(logger))
+    estimation.add_messages(messages)
     estimation.estimator_name = plugin2name(plug_in)
 
     # See if this estimation matches user requested plug-in and min accuracy
@@ -67,6 +142,46 @@ def call_plug_in(plug_in: Any, query: AccelergyQuery, target_func: Callable,
     return estimation
 
 
+def implements_batch(plug_in: Any, method_name: str) -> bool:
+    """ Returns whether a plug-in overrides the per-query default of a batch method. """
+    if not isinstance(plug_in, AccelergyPlugIn):
+        return False
+    batch_method_name = f'{method_name}_batch'
+    return getattr(type(plug_in), batch_method_name) is not getattr(AccelergyPlugIn, batch_method_name)
+
+
+def call_plug_in_batch(plug_in: Any, queries: List[AccelergyQuery], method_name: str,
+                       estimation_type: Union[Estimation, AccuracyEstimation]) -> List[Estimation]:
+    """
+    Calls plug_in.<method_name>_batch if the plug-in implements it, else plug_in.<method_name> for
+    each query. Messages logged during a batch call are added to every estimation in the batch. If
+    the batch call fails or times out, each query is retried on its own. A batch may take as long
+    as its queries' timeouts combined.
+    """
+    if implements_batch(plug_in, method_name):
+        logger = plug_in.logger
+        batch_method_name = f'{method_name}_batch'
+        start = start_call(plug_in, batch_method_name, queries)
+        estimations = None
+        try:
+            estimations = list(watch(run_to_completion, getattr(plug_in, batch_method_name),
+                                     queries, scale=len(queries)))
+            end_call(plug_in, batch_method_name, queries, estimations, start)
+            if len(estimations) != len(queries):
+                raise ValueError(f'Returned {len(estimations)} results for {len(queries)} queries.')
+        except Exception as e:
+            if estimations is None:
+                end_call(plug_in, batch_method_name, queries, None, start, e)
+            logging.getLogger('').info(indent_list_text_block(
+                f'{plugin2name(plug_in)} {method_name}_batch failed with {type(e).__name__}: {e}. '
+                f'Retrying each query on its own. Messages:', pop_all_messages(logger)))
+        else:
+            messages = pop_all_messages(logger)
+            return [check_estimation(plug_in, q, e, estimation_type, messages)
+                    for q, e in zip(queries, estimations)]
+    return [call_plug_in(plug_in, q, getattr(plug_in, method_name), estimation_type) for q in queries]
+
+
 def primitive_energy_supported(plug_in: Any, query: AccelergyQuery) -> AccuracyEstimation:
     return call_plug_in(plug_in, query, plug_in.primitive_action_supported, AccuracyEstimation)
 
@@ -83,33 +198,352 @@ def get_area_estimation(plug_in: Any, query: AccelergyQuery) -> AccuracyEstimati
     return call_plug_in(plug_in, query, plug_in.estimate_area, Estimation)
 
 
-def get_best_estimate(plug_ins: List[Union[AccelergyPlugIn, Any]], query: Dict[str, Any],
+def get_static_accuracy_key(query: AccelergyQuery) -> tuple:
+    """
+    The parts of a query that a static-accuracy plug-in's accuracy depends on: the class and action
+    names, which attributes and arguments are given, and the attributes that select plug-ins.
+    """
+    attrs = query.class_attrs
+    args = query.action_args or {}
+    return (
+        query.class_name,
+        query.action_name,
+        frozenset(attrs.keys()),
+        frozenset(k for k, v in args.items() if v is not None),
+        canonicalize_query_value(attrs.get('plug_in', None)),
+        canonicalize_query_value(attrs.get('minimum_accuracy', None)),
+        canonicalize_query_value(attrs.get('min_accuracy', None)),
+    )
+
+
+class PlugInIndex:
+    """
+    Dispatch index for a set of plug-ins, built once per run.
+
+    Plug-ins that list their supported classes are only queried for those classes. Plug-ins that
+    don't (including all legacy plug-ins) are in a fallback bucket and are queried for every
+    class. Estimator-based plug-ins report a fixed accuracy that depends only on which classes,
+    actions, attributes, and arguments are given, so their accuracy is computed once per
+    (class, action, attribute names) and reused. When every candidate for a query is such a
+    plug-in, repeat queries skip the accuracy round entirely and go straight to the learned
+    ranking.
+
+    Queries that pin a plug-in with the "plug_in" attribute only query that plug-in. Accuracy
+    checks stop once a plug-in reaches accuracy_ceiling. With the default ceiling of 100, this does
+    not change which plug-in is selected. With a lower ceiling, the first plug-in to reach it is
+    treated as equal to any more accurate plug-ins.
+    """
+    def __init__(self, plug_ins: List[Union[AccelergyPlugIn, Any]],
+                 accuracy_ceiling: Number = MAX_ACCURACY):
+        self.plug_ins = list(plug_ins)
+        self.accuracy_ceiling = accuracy_ceiling
+        self.class2positions = {}
+        self.fallback_positions = []
+        for i, plug_in in enumerate(self.plug_ins):
+            class_names = None
+            if isinstance(plug_in, AccelergyPlugIn):
+                class_names = plug_in.get_supported_class_names()
+            if class_names is None:
+                self.fallback_positions.append(i)
+                continue
+            for class_name in class_names:
+                self.class2positions.setdefault(class_name, []).append(i)
+        self.candidates = {}
+        self.accuracy_memo = {}
+        self.accuracy_calls = 0
+        self.accuracy_calls_skipped = 0
+
+    def __iter__(self):
+        return iter(self.plug_ins)
+
+    def __len__(self):
+        return len(self.plug_ins)
+
+    def get_candidates(self, class_name: str) -> List[Union[AccelergyPlugIn, Any]]:
+        """ Returns the plug-ins that may estimate a class, in their original order. """
+        if class_name not in self.candidates:
+            positions = sorted(self.class2positions.get(class_name, []) + self.fallback_positions)
+            self.candidates[class_name] = [self.plug_ins[i] for i in positions]
+        return self.candidates[class_name]
+
+    def get_query_candidates(self, query: AccelergyQuery) -> List[Union[AccelergyPlugIn, Any]]:
+        """ Returns the candidates for a query's class, or only its pinned plug-in. """
+        candidates = self.get_candidates(query.class_name)
+        if 'plug_in' not in query.class_attrs:
+            return candidates
+        return [p for p in candidates if plugin2name(p) == query.class_attrs['plug_in']]
+
+    def get_excluded_reasons(self, query: AccelergyQuery) -> List[str]:
+        candidates = self.get_candidates(query.class_name)
+        reasons = [f'{plugin2name(p)} does not support class {query.class_name}.'
+                   for p in self.plug_ins if not any(p is c for c in candidates)]
+        if 'plug_in' in query.class_attrs:
+            reasons += [f'Plug-in {plugin2name(p)} was not selected for query.'
+                        for p in candidates if plugin2name(p) != query.class_attrs['plug_in']]
+        return reasons
+
+    def reached_ceiling(self, accuracy: AccuracyEstimation) -> bool:
+        return accuracy.success and accuracy.value >= self.accuracy_ceiling
+
+    def sort_accuracies(self, accuracies: List[Tuple[Any, AccuracyEstimation]]
+                        ) -> List[Tuple[Any, AccuracyEstimation]]:
+        """ Most accurate first. Accuracies at or above the ceiling are equal. Stable. """
+        return sorted(accuracies, key=lambda x: min(x[1].value, self.accuracy_ceiling),
+                      reverse=True)
+
+    def get_accuracies(self, queries: List[AccelergyQuery], is_energy_estimation: bool,
+                       to_check: List[List[Any]] = None
+                       ) -> List[List[Tuple[Any, AccuracyEstimation]]]:
+        """
+        Returns (plug-in, accuracy) for the given plug-ins of each query, defaulting to all of
+        its candidates. Accuracy checks are grouped by plug-in so that batch-capable plug-ins are
+        called once for all queries.
+        """
+        checks, query_keys = self.plan_accuracy_checks(queries, is_energy_estimation, to_check)
+        method_name = get_accuracy_method_name(is_energy_estimation)
+        accuracies = [call_plug_in_batch(plug_in, [q for _, q in plug_in_checks], method_name,
+                                         AccuracyEstimation)
+                      for plug_in, plug_in_checks in checks]
+        return self.record_accuracies(checks, accuracies, query_keys)
+
+    def plan_accuracy_checks(self, queries: List[AccelergyQuery], is_energy_estimation: bool,
+                             to_check: List[List[Any]] = None
+                             ) -> Tuple[List[Tuple[Any, List[Tuple[tuple, AccelergyQuery]]]], list]:
+        """
+        Returns the accuracy checks to make, grouped by plug-in, and the keys that each query's
+        accuracies are recorded under.
+        """
+        checks = {}
+        pending_keys = set()
+        query_keys = []
+        for i, query in enumerate(queries):
+            candidates = self.get_query_candidates(query) if to_check is None else to_check[i]
+            static_key = None
+            keys = []
+            for plug_in in candidates:
+                if isinstance(plug_in, EstimatorWrapper):
+                    if static_key is None:
+                        static_key = (is_energy_estimation, get_static_accuracy_key(query))
+                    key = (id(plug_in), static_key)
+                    keys.append(key)
+                    if key in self.accuracy_memo or key in pending_keys:
+                        self.accuracy_calls_skipped += 1
+                        continue
+                    pending_keys.add(key)
+                else:
+                    key = (id(plug_in), i)
+                    keys.append(key)
+                checks.setdefault(id(plug_in), (plug_in, []))[1].append((key, query))
+            query_keys.append((candidates, keys))
+        return list(checks.values()), query_keys
+
+    def record_accuracies(self, checks: list, accuracies: List[List[AccuracyEstimation]],
+                          query_keys: list) -> List[List[Tuple[Any, AccuracyEstimation]]]:
+        checked = {}
+        for (plug_in, plug_in_checks), plug_in_accuracies in zip(checks, accuracies):
+            self.accuracy_calls += len(plug_in_checks)
+            for (key, _), accuracy in zip(plug_in_checks, plug_in_accuracies):
+                if isinstance(plug_in, EstimatorWrapper):
+                    self.accuracy_memo[key] = accuracy
+                else:
+                    checked[key] = accuracy
+        return [
+            [(p, checked[k] if k in checked else self.accuracy_memo[k]) for p, k in zip(*c_k)]
+            for c_k in query_keys
+        ]
+
+
+def get_accuracy_method_name(is_energy_estimation: bool) -> str:
+    return 'primitive_action_supported' if is_energy_estimation else 'primitive_area_supported'
+
+
+def get_estimate_method_name(is_energy_estimation: bool) -> str:
+    return 'estimate_energy' if is_energy_estimation else 'estimate_area'
+
+
+def get_best_estimate(plug_ins: Union[List[Union[AccelergyPlugIn, Any]], PlugInIndex],
+                      query: Union[Dict[str, Any], AccelergyQuery],
                       is_energy_estimation: bool) -> Estimation:
-    acc_func = primitive_energy_supported if is_energy_estimation else primitive_area_supported
-    est_func = get_energy_estimation if is_energy_estimation else get_area_estimation
-    query = AccelergyQuery.from_interface_dict(query)
+    return get_best_estimates(plug_ins, [query], is_energy_estimation)[0]
+
+
+def get_best_estimates(plug_ins: Union[List[Union[AccelergyPlugIn, Any]], PlugInIndex],
+                       queries: List[Union[Dict[str, Any], AccelergyQuery]],
+                       is_energy_estimation: bool) -> List[Estimation]:
+    """
+    Returns the best estimate for each query. Each query tries its plug-ins from most to least
+    accurate until one succeeds, as if the queries were estimated one at a time. Within each round
+    of attempts, queries are grouped by plug-in so that plug-ins implementing the batch methods
+    are called once per round.
+    """
+    method_name = get_estimate_method_name(is_energy_estimation)
+    queries = [q if isinstance(q, AccelergyQuery) else AccelergyQuery.from_interface_dict(q)
+               for q in queries]
+    if not isinstance(plug_ins, PlugInIndex):
+        plug_ins = PlugInIndex(plug_ins)
+    candidates = [plug_ins.get_query_candidates(q) for q in queries]
+    accuracies = [[] for _ in queries]
+
+    def check_accuracies(indices: List[int], stop_at_ceiling: bool):
+        # Check in plug-in order. If stopping at the ceiling, check one plug-in per round.
+        while indices:
+            to_check = [candidates[i][len(accuracies[i]):] for i in indices]
+            if stop_at_ceiling:
+                to_check = [c[:1] for c in to_check]
+            checked = plug_ins.get_accuracies([queries[i] for i in indices], is_energy_estimation,
+                                              to_check)
+            for i, i_checked in zip(indices, checked):
+                accuracies[i] += i_checked
+            indices = [i for i in indices if len(accuracies[i]) < len(candidates[i])
+                       and not plug_ins.reached_ceiling(accuracies[i][-1][1])]
+
+    check_accuracies(list(range(len(queries))), True)
+
+    failed = [[] for _ in queries]
+    best = [None for _ in queries]
+    tried = [set() for _ in queries]
+    pending = list(range(len(queries)))
+    while pending:
+        # If the plug-in that reached the ceiling failed, the rest must be checked before choosing
+        check_accuracies([i for i in pending if failed[i] and
+                          len(accuracies[i]) < len(candidates[i])], False)
+        batches = {}
+        for i in pending:
+            options = [(p, a) for p, a in plug_ins.sort_accuracies(accuracies[i])
+                       if a.success and a.value != 0 and id(p) not in tried[i]]
+            if options:
+                plug_in, accuracy = options[0]
+                tried[i].add(id(plug_in))
+                batches.setdefault(id(plug_in), (plug_in, []))[1].append((i, accuracy))
+        for plug_in, batch in batches.values():
+            estimations = call_plug_in_batch(
+                plug_in, [copy.deepcopy(queries[i]) for i, _ in batch], method_name, Estimation)
+            for (i, accuracy), estimation in zip(batch, estimations):
+                if estimation.success:
+                    best[i] = (accuracy, estimation)
+                else:
+                    failed[i].append((accuracy, estimation))
+        pending = [i for i in pending if best[i] is None and
+                   any(id(p) in tried[i] for p, _ in batches.values())]
+
+    for i in range(len(queries)):
+        plug_ins.accuracy_calls_skipped += len(plug_ins) - len(accuracies[i])
+    return [
+        log_best_estimate(plug_ins, query, is_energy_estimation,
+                          plug_ins.sort_accuracies(accuracies[i]),
+                          failed[i], best[i], candidates[i][len(accuracies[i]):])
+        for i, query in enumerate(queries)
+    ]
+
+
+async def call_plug_in_async(plug_in: Any, query: AccelergyQuery, method_name: str,
+                             estimation_type: Union[Estimation, AccuracyEstimation],
+                             limiter: asyncio.Semaphore, executor: Executor) -> Estimation:
+    """
+    Calls one plug-in method once limiter allows. Coroutines are awaited on the running loop and
+    synchronous methods are run in executor. Messages are captured per call so that concurrent
+    calls to the same plug-in do not mix their messages.
+    """
+    target_func = getattr(plug_in, method_name)
+    async with limiter:
+        if not inspect.iscoroutinefunction(target_func):
+            return await asyncio.get_running_loop().run_in_executor(
+                executor, call_capturing_messages, call_plug_in, plug_in, query, target_func,
+                estimation_type)
+        return await await_capturing_messages(await_plug_in, plug_in, query, target_func,
+                                              estimation_type)
+
+
+async def await_plug_in(plug_in: AccelergyPlugIn, query: AccelergyQuery, target_func: Callable,
+                        estimation_type: Union[Estimation, AccuracyEstimation]) -> Estimation:
+    method_name = target_func.__name__
+    start = start_call(plug_in, method_name, query)
+    try:
+        estimation = await watch_async(target_func(query))
+    except Exception as e:
+        end_call(plug_in, method_name, query, None, start, e)
+        estimation = estimation_type(0, success=False)
+        estimation.timed_out = isinstance(e, PlugInTimeoutError)
+        plug_in.logger.error(f'{type(e).__name__}: {e}')
+    else:
+        end_call(plug_in, method_name, query, estimation, start)
+    return check_estimation(plug_in, query, estimation, estimation_type,
+                            pop_all_messages(plug_in.logger))
+
+
+async def get_best_estimates_async(plug_ins: Union[List[Union[AccelergyPlugIn, Any]], PlugInIndex],
+                                   queries: List[Union[Dict[str, Any], AccelergyQuery]],
+                                   is_energy_estimation: bool,
+                                   concurrency: int) -> List[Estimation]:
+    """
+    Returns the best estimate for each query, making up to "concurrency" plug-in calls at once.
+    Plug-ins are selected as in get_best_estimates: all accuracy checks are made concurrently, then
+    each query tries its plug-ins from most to least accurate, concurrently with other queries.
+    Accuracy checks do not stop at the accuracy ceiling.
+    """
+    queries = [q if isinstance(q, AccelergyQuery) else AccelergyQuery.from_interface_dict(q)
+               for q in queries]
+    if not isinstance(plug_ins, PlugInIndex):
+        plug_ins = PlugInIndex(plug_ins)
+    limiter = asyncio.Semaphore(concurrency)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        async def call(plug_in, query, method_name, estimation_type):
+            return await call_plug_in_async(
+                plug_in, query, method_name, estimation_type, limiter, executor)
+
+        checks, query_keys = plug_ins.plan_accuracy_checks(queries, is_energy_estimation)
+        method_name = get_accuracy_method_name(is_energy_estimation)
+        accuracies = await asyncio.gather(*(
+            asyncio.gather(*(call(plug_in, q, method_name, AccuracyEstimation)
+                             for _, q in plug_in_checks))
+            for plug_in, plug_in_checks in checks
+        ))
+        all_accuracies = [
+            plug_ins.sort_accuracies(a)
+            for a in plug_ins.record_accuracies(checks, accuracies, query_keys)
+        ]
+        for a in all_accuracies:
+            plug_ins.accuracy_calls_skipped += len(plug_ins) - len(a)
+
+        method_name = get_estimate_method_name(is_energy_estimation)
+        failed = [[] for _ in queries]
+        best = [None for _ in queries]
+
+        async def estimate(i):
+            for plug_in, accuracy in all_accuracies[i]:
+                if not accuracy.success or accuracy.value == 0:
+                    continue
+                estimation = await call(plug_in, copy.deepcopy(queries[i]), method_name, Estimation)
+                if estimation.success:
+                    best[i] = (accuracy, estimation)
+                    return
+                failed[i].append((accuracy, estimation))
+
+        await asyncio.gather(*(estimate(i) for i in range(len(queries))))
+
+    return [
+        log_best_estimate(plug_ins, query, is_energy_estimation, all_accuracies[i], failed[i], best[i])
+        for i, query in enumerate(queries)
+    ]
+
+
+def log_best_estimate(plug_ins: PlugInIndex, query: AccelergyQuery, is_energy_estimation: bool,
+                      accuracies: List[Tuple[Any, AccuracyEstimation]],
+                      estimations: List[Tuple[AccuracyEstimation, Estimation]],
+                      best: Union[Tuple[AccuracyEstimation, Estimation], None],
+                      unchecked: List[Any] = ()) -> Estimation:
+    """ Logs how the estimate for a query was chosen. Exits if no plug-in could estimate it. """
     target = 'ENERGY' if is_energy_estimation else 'AREA'
     if logging.getLogger('').isEnabledFor(logging.INFO):
         logging.getLogger('').info('')
     logging.getLogger('').info(f'{target} ESTIMATION for {query}')
 
-    accuracies = [(plug_in, acc_func(plug_in, query)) for plug_in in plug_ins]
-    estimations = []
-    accuracies = sorted(accuracies, key=lambda x: x[1].value, reverse=True)
-    estimation = None
-    for plug_in, accuracy in accuracies:
-        if not accuracy.success or accuracy.value == 0:
-            continue
-        estimation = est_func(plug_in, copy.deepcopy(query))
-        logger = get_logger(plugin2name(plug_in))
-        if not estimation.success:
-            estimation.add_messages(pop_all_messages(logger))
-            estimations.append((accuracy, estimation))
-        else:
-            log_all_lines(f'Accelergy', 'info', f'{estimation.estimator_name} estimated '
-                          f'{estimation} with accuracy {accuracy}. ' +
-                          indent_list_text_block('Messages:', estimation.messages))
-            break
+    if best is not None:
+        accuracy, estimation = best
+        log_all_lines(f'Accelergy', 'info', f'{estimation.estimator_name} estimated '
+                      f'{estimation} with accuracy {accuracy}. ' +
+                      indent_list_text_block('Messages:', estimation.messages))
 
     full_logs_acc = [
         indent_list_text_block(
@@ -121,7 +555,7 @@ def get_best_estimate(plug_ins: List[Union[AccelergyPlugIn, Any]], query: Dict[s
             f'{e.estimator_name} with accuracy {a} estimating value: ', e.messages)
         for a, e in estimations
     ]
-    full_logs = (full_logs_acc if full_logs_acc[0] else [
+    full_logs = (full_logs_acc if full_logs_acc and full_logs_acc[0] else [
     ]) + full_logs_estimations
     fail_reasons_accuracy = [
         f'{e.estimator_name} with accuracy {e} estimating accuracy: {e.lastmessage()}'
@@ -131,7 +565,11 @@ def get_best_estimate(plug_ins: List[Union[AccelergyPlugIn, Any]], query: Dict[s
         f'{e.estimator_name} with accuracy {a} estimating value: '
         f'{e.lastmessage()}' for a, e in estimations
     ]
-    fail_reasons = fail_reasons_accuracy + fail_reasons_estimations
+    fail_reasons_class = plug_ins.get_excluded_reasons(query) + [
+        f'{plugin2name(p)} was not checked because a plug-in reached accuracy '
+        f'{plug_ins.accuracy_ceiling}%.' for p in unchecked
+    ]
+    fail_reasons = fail_reasons_class + fail_reasons_accuracy + fail_reasons_estimations
 
     if full_logs:
         log_all_lines('Accelergy', 'debug', indent_list_text_block(
@@ -144,8 +582,10 @@ def get_best_estimate(plug_ins: List[Union[AccelergyPlugIn, Any]], query: Dict[s
                       indent_list_text_block('Plug-ins provided accuracy, but failed to estimate:',
                                              fail_reasons_estimations))
 
-    if estimation and estimation.success:
-        return estimation
+    if best is not None:
+        # A plug-in that timed out may have given a better estimate
+        best[1].timed_out = any(e.timed_out for _, e in accuracies + estimations)
+        return best[1]
 
     estimation_target = 'energy' if is_energy_estimation else 'area'
     ERROR_CLEAN_EXIT(
@@ -153,3 +593,116 @@ def get_best_estimate(plug_ins: List[Union[AccelergyPlugIn, Any]], query: Dict[s
           f'{indent_list_text_block("Logs for plug-ins that could estimate query:", full_logs)}\n'
           f'{indent_list_text_block("Why plug-ins did not estimate:", fail_reasons)}\n').splitlines()
     )
+
+
+class EstimationMemo:
+    """
+    In-process memo in front of get_best_estimate. Queries are keyed on their canonical form, so
+    identical primitives in different components (e.g. every PE in an array) are estimated once
+    per run. Misses are looked up in the on-disk estimation cache, if one is given, before the
+    plug-ins are queried.
+    """
+    def __init__(self, plug_ins: List[Union[AccelergyPlugIn, Any]], estimation_cache: Any = None,
+                 accuracy_ceiling: Number = MAX_ACCURACY):
+        self.plug_ins = PlugInIndex(plug_ins, accuracy_ceiling)
+        self.estimation_cache = estimation_cache
+        self.memo = {}
+        self.prefetched = set()
+        self.hits = 0
+        self.misses = 0
+
+    def get_best_estimate(self, query: Union[Dict[str, Any], AccelergyQuery],
+                          is_energy_estimation: bool) -> Estimation:
+        if not isinstance(query, AccelergyQuery):
+            query = AccelergyQuery.from_interface_dict(query)
+        key = (is_energy_estimation, query.get_canonical_key())
+        if key in self.prefetched:
+            self.prefetched.remove(key)
+            self.misses += 1
+            return self.memo[key]
+        if key in self.memo:
+            self.hits += 1
+            logging.getLogger('').debug(f'Reusing estimation for {query}: {self.memo[key]}')
+            return self.memo[key]
+        self.misses += 1
+
+        estimation = None
+        if self.estimation_cache is not None:
+            estimation = self.estimation_cache.get(query, is_energy_estimation)
+        if estimation is None:
+            estimation = get_best_estimate(self.plug_ins, query, is_energy_estimation)
+            if self.estimation_cache is not None:
+                self.estimation_cache.put(query, is_energy_estimation, estimation)
+        self.memo[key] = estimation
+        return estimation
+
+    def prefetch(self, queries: List[Union[Dict[str, Any], AccelergyQuery]],
+                 is_energy_estimation: bool, jobs: int = 1, concurrency: int = 1):
+        """
+        Estimates every query that is not already known in batches, using up to "jobs" processes.
+        If concurrency > 1, each process makes up to that many plug-in calls at once. Later calls
+        to get_best_estimate for these queries return the prefetched estimations.
+        """
+        to_estimate = {}
+        for query in queries:
+            if not isinstance(query, AccelergyQuery):
+                query = AccelergyQuery.from_interface_dict(query)
+            key = (is_energy_estimation, query.get_canonical_key())
+            if key in self.memo or key in to_estimate:
+                continue
+            estimation = None
+            if self.estimation_cache is not None:
+                estimation = self.estimation_cache.get(query, is_energy_estimation)
+            if estimation is not None:
+                self.memo[key] = estimation
+                self.prefetched.add(key)
+            else:
+                to_estimate[key] = query
+
+        keys, to_estimate = list(to_estimate.keys()), list(to_estimate.values())
+        if not to_estimate:
+            return
+        logging.getLogger('').info(
+            f'Estimating {len(to_estimate)} unique queries' +
+            (f' with {jobs} parallel jobs.' if jobs > 1 else '.'))
+        # One batch if serial. Otherwise, smaller batches so that the jobs finish together.
+        batch_size = len(to_estimate) if jobs <= 1 else -(-len(to_estimate) // (jobs * 4))
+        batches = [to_estimate[i:i + batch_size] for i in range(0, len(to_estimate), batch_size)]
+        def estimate_batch(batch):
+            profiler = get_profiler()
+            profile_start = len(profiler.records) if profiler is not None else 0
+            if concurrency > 1:
+                estimations = run_coroutine(get_best_estimates_async(
+                    self.plug_ins, batch, is_energy_estimation, concurrency))
+            else:
+                estimations = get_best_estimates(self.plug_ins, batch, is_energy_estimation)
+            # Worker processes send back what they profiled with their estimations
+            return estimations, profiler.pop_records(profile_start) if profiler is not None else []
+
+        estimations = []
+        for batch_estimations, profile_records in map_in_process_pool(estimate_batch, batches, jobs):
+            estimations += batch_estimations
+            if profile_records:
+                get_profiler().add_records(profile_records)
+        for key, query, estimation in zip(keys, to_estimate, estimations):
+            self.memo[key] = estimation
+            self.prefetched.add(key)
+            if self.estimation_cache is not None:
+                self.estimation_cache.put(query, is_energy_estimation, estimation)
+
+    def log_statistics(self):
+        total = self.hits + self.misses
+        if total:
+            logging.getLogger('').info(
+                f'Estimated {self.misses} unique plug-in queries. Reused {self.hits} of {total} '
+                f'queries ({100 * self.hits / total:.1f}%) from earlier in this run.')
+        index = self.plug_ins
+        accuracy_total = index.accuracy_calls + index.accuracy_calls_skipped
+        if accuracy_total:
+            logging.getLogger('').info(
+                f'Made {index.accuracy_calls} plug-in accuracy checks. Skipped '
+                f'{index.accuracy_calls_skipped} ({100 * index.accuracy_calls_skipped / accuracy_total:.1f}%) '
+                f'using the plug-in class index, pinned plug-ins, learned accuracies, and the '
+                f'accuracy ceiling.')
+        if self.estimation_cache is not None:
+            self.estimation_cache.log_statistics()
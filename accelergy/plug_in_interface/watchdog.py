@@ -0,0 +1,101 @@
+import asyncio
+import contextvars
+import threading
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+# The watchdog that plug-in calls are run under, or None if calls are not time-limited
+WATCHDOG = None
+
+
+class PlugInTimeoutError(Exception):
+    """ Raised when a plug-in call runs past its timeout or the estimation budget. """
+
+
+def get_watchdog() -> 'Watchdog':
+    return WATCHDOG
+
+
+def set_watchdog(watchdog: 'Watchdog'):
+    global WATCHDOG
+    WATCHDOG = watchdog
+
+
+class Watchdog:
+    """
+    Limits the time of each plug-in call and of all plug-in calls together.
+
+    Each call may take up to query_timeout seconds, and no call may run past the end of the
+    budget, which starts when the watchdog is created. Python can't stop a running function, so a
+    call that times out is left to finish in a daemon thread and its result is discarded.
+    Coroutines are cancelled.
+    """
+    def __init__(self, query_timeout: Optional[float] = None, budget: Optional[float] = None):
+        self.query_timeout = query_timeout
+        self.deadline = time.monotonic() + budget if budget is not None else None
+
+    def get_timeout(self, scale: int = 1) -> Optional[float]:
+        """ Returns the time allowed for a call, or None if there is no limit. """
+        timeouts = []
+        if self.query_timeout is not None:
+            timeouts.append(self.query_timeout * scale)
+        if self.deadline is not None:
+            timeouts.append(self.deadline - time.monotonic())
+        if not timeouts:
+            return None
+        timeout = min(timeouts)
+        if timeout <= 0:
+            raise PlugInTimeoutError('The estimation time budget is used up.')
+        return timeout
+
+    def call(self, func: Callable, *args, scale: int = 1) -> Any:
+        timeout = self.get_timeout(scale)
+        if timeout is None:
+            return func(*args)
+        outcome = {}
+        context = contextvars.copy_context()
+
+        def run():
+            try:
+                outcome['result'] = context.run(func, *args)
+            except BaseException as e:
+                outcome['error'] = e
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        thread.join(timeout)
+        if thread.is_alive():
+            raise PlugInTimeoutError(f'Call did not finish in {timeout:.3g} seconds.')
+        if 'error' in outcome:
+            raise outcome['error']
+        return outcome['result']
+
+    async def call_async(self, awaitable: Awaitable) -> Any:
+        try:
+            timeout = self.get_timeout()
+        except PlugInTimeoutError:
+            if asyncio.iscoroutine(awaitable):
+                awaitable.close()
+            raise
+        if timeout is None:
+            return await awaitable
+        try:
+            return await asyncio.wait_for(awaitable, timeout)
+        except asyncio.TimeoutError:
+            raise PlugInTimeoutError(f'Call did not finish in {timeout:.3g} seconds.') from None
+
+
+def watch(func: Callable, *args, scale: int = 1) -> Any:
+    """
+    Calls func(*args) under the watchdog, if there is one. scale multiplies the per-call timeout
+    for calls that do the work of several queries.
+    """
+    if WATCHDOG is None:
+        return func(*args)
+    return WATCHDOG.call(func, *args, scale=scale)
+
+
+async def watch_async(awaitable: Awaitable) -> Any:
+    if WATCHDOG is None:
+        return await awaitable
+    return await WATCHDOG.call_async(awaitable)
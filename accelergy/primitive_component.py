@@ -1,4 +1,3 @@
-from copy import deepcopy
 from accelergy.utils.utils import  *
 from accelergy.parsing_utils import *
 
@@ -21,7 +20,7 @@ class PrimitiveComponent():
         actionNameList = component_class.get_action_name_list()
         flattenedActionList = []
         for actionName in actionNameList:
-            actionObj = deepcopy(component_class.get_action(actionName))
+            actionObj = component_class.get_action(actionName)
             flattened = actionObj.flatten_action_args_into_list(self.get_attributes())
             for action in flattened:
                 flattenedActionList.append(action)
@@ -0,0 +1,160 @@
+import hashlib
+import os
+import pickle
+import sys
+import tempfile
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+import ruamel.yaml
+import accelergy.version as version
+from accelergy.utils.utils import INFO, WARN, create_folder
+from accelergy.utils.yaml import get_file_fingerprint, load_yaml
+
+# Increase when the format of the index changes
+INDEX_FORMAT = 1
+
+
+def find_library_files(library_paths: List[str]) -> Tuple[List[str], Dict[str, int]]:
+    """
+    Returns the primitive component library files in the "primitive_components" paths of the
+    config, in the order that they are loaded, and the modification time of every directory
+    searched. Adding or removing a file changes the modification time of its directory.
+    """
+    files, directories = [], {}
+    for path in library_paths:
+        if ".yaml" in path:
+            files.append(path)
+        for root, _, file_names in os.walk(path):
+            directories[root] = os.stat(root).st_mtime_ns
+            for file_name in file_names:
+                if ".lib.yaml" in file_name:
+                    files.append(root + os.sep + file_name)
+    return files, directories
+
+
+def directories_unchanged(directories: Dict[str, int]) -> bool:
+    for directory, mtime in directories.items():
+        try:
+            if os.stat(directory).st_mtime_ns != mtime:
+                return False
+        except OSError:
+            return False
+    return True
+
+
+class PrimitiveClasses(Mapping):
+    """
+    Primitive component class descriptions by class name. A description is only unpickled when
+    it is first looked up, so classes that are never used cost nothing.
+    """
+    def __init__(self, records: Dict[str, Tuple[str, bytes]]):
+        self.records = records  # class name -> (library file, pickled description)
+        self.descriptions = {}
+
+    def __getitem__(self, name: str) -> Dict[str, Any]:
+        if name not in self.descriptions:
+            self.descriptions[name] = pickle.loads(self.records[name][1])
+        return self.descriptions[name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.records)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def get_library_file(self, name: str) -> str:
+        return self.records[name][0]
+
+    def subset(self, names: Set[str]) -> 'PrimitiveClasses':
+        """ The classes with the given names """
+        return PrimitiveClasses({name: record for name, record in self.records.items() if name in names})
+
+
+class PrimitiveLibraryIndex:
+    """
+    Index of the primitive component classes in the libraries of the config. If a cache directory
+    is given (with --cache_inputs), the index is stored there so that unchanged libraries are not
+    searched or parsed again. Otherwise, it is built from the libraries in every run.
+
+    The index holds every library file with its modification time, size, and hash, and the
+    pickled description of every class that it defines. It is read with one load at startup. A
+    library whose modification time or size changed is parsed again if its hash changed too, and
+    the directories are searched again if a file was added or removed. Any change rewrites the
+    index.
+    """
+    def __init__(self, library_paths: List[str], cache_dir: Optional[str] = None):
+        self.library_paths = [os.path.abspath(p) for p in library_paths]
+        self.cache_dir, self.path = None, None
+        if cache_dir is not None:
+            self.cache_dir = os.path.abspath(os.path.expanduser(cache_dir))
+            key = (INDEX_FORMAT, version.__version__, ruamel.yaml.__version__, sys.version_info[:2],
+                   tuple(self.library_paths))
+            self.path = os.path.join(self.cache_dir, hashlib.sha256(repr(key).encode('utf-8')).hexdigest() + '.pickle')
+
+    def read(self) -> Optional[Dict[str, Any]]:
+        if self.path is None:
+            return None
+        try:
+            with open(self.path, 'rb') as f:
+                return pickle.load(f)
+        except Exception:
+            # Missing, or written by an incompatible version. Either way, the index is rebuilt.
+            return None
+
+    def write(self, index: Dict[str, Any]):
+        tmp_path = None
+        try:
+            create_folder(self.cache_dir)
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix='.tmp-', suffix='.pickle')
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(index, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.path)
+        except (OSError, pickle.PicklingError, TypeError, AttributeError) as e:
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            WARN(f'Could not write the primitive component library index at {self.path}: {e}')
+
+    def parse_library(self, path: str) -> List[Tuple[str, bytes]]:
+        primitive_component_list = load_yaml(path)
+        records = [(pc_description['name'], pickle.dumps(pc_description, protocol=pickle.HIGHEST_PROTOCOL))
+                   for pc_description in primitive_component_list['classes']]
+        INFO('primitive component file parsed: ', path)
+        return records
+
+    def load(self) -> PrimitiveClasses:
+        """ Returns the classes of all libraries, refreshing the index if any library changed """
+        index = self.read()
+        if index is not None and directories_unchanged(index['directories']):
+            files, directories = index['files'], index['directories']
+        else:
+            files, directories = find_library_files(self.library_paths)
+        old_libraries = index['libraries'] if index is not None else {}
+
+        changed = index is None or files != index['files'] or directories != index['directories']
+        libraries = {}
+        for path in files:
+            if self.path is None:  # Nothing to compare to or store
+                libraries[path] = (None, self.parse_library(path))
+                continue
+            fingerprint, records = old_libraries.get(path, (None, None))
+            stat = get_file_fingerprint(path, False)
+            if fingerprint is None or fingerprint[:2] != stat[:2]:
+                new_fingerprint = get_file_fingerprint(path)
+                if fingerprint is None or fingerprint[2] != new_fingerprint[2]:
+                    records = self.parse_library(path)
+                fingerprint = new_fingerprint
+                changed = True
+            libraries[path] = (fingerprint, records)
+        if changed and self.path is not None:
+            self.write({'files': files, 'directories': directories, 'libraries': libraries})
+        elif not changed:
+            INFO(f'Primitive component libraries loaded from index at {self.path}')
+
+        classes = {}
+        for path in files:
+            for name, record in libraries[path][1]:
+                if name in classes:
+                    WARN(f'{name} redefined in {path}')
+                classes[name] = (path, record)
+        return PrimitiveClasses(classes)
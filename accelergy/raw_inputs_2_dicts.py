@@ -1,11 +1,19 @@
 from copy import deepcopy
+import threading
 from accelergy.parsing_utils import *
-from collections import OrderedDict
+from collections import OrderedDict, deque
 import accelergy.version as version
-from accelergy.utils.yaml import load_yaml, write_yaml_file
+from accelergy.primitive_library_index import PrimitiveLibraryIndex
+from accelergy.utils.parallel import map_in_process_pool
+from accelergy.utils.yaml import (
+    get_parsed_yaml_cache,
+    get_top_keys,
+    load_yaml,
+    write_yaml_file,
+)
 
 class RawInputs2Dicts:
-    def __init__(self, input_info, update_config_version=False):
+    def __init__(self, input_info, update_config_version=False, load_libraries=True):
         self.parser_version = input_info["parser_version"]
         self.possible_top_keys = {
             "architecture",
@@ -15,7 +23,14 @@ class RawInputs2Dicts:
             "flattened_architecture",
             "variables",
         }
+        # inputs with only these top keys are only read, and can be large
+        self.fast_load_top_keys = {"action_counts", "ERT"}
         self.path_arglist = input_info["path_arglist"]
+        # files without any of these top keys are not parsed
+        self.needed_top_keys = input_info.get(
+            "needed_top_keys", self.possible_top_keys
+        )
+        self.jobs = input_info.get("jobs", 1)
         self.flatten_arch_spec_dict = {}
         self.hier_arch_spec_dict = {}
         self.cc_classes_dict = {}
@@ -24,6 +39,10 @@ class RawInputs2Dicts:
         self.action_counts_dict = {}
         self.config = None
         self.arch_variables = {}
+        # component class libraries are only needed to define the architecture's components
+        self.load_libraries = load_libraries
+        # classes that the architecture references, or None to define every class
+        self.referenced_class_names = None
         self.load_and_construct_dicts(update_config_version)
 
     def load_and_construct_dicts(self, update_config_version):
@@ -33,45 +52,37 @@ class RawInputs2Dicts:
 
         # merge all paths (input + compound compondnt lib)
         all_paths = self.path_arglist
-        if "compound_components" in self.config:
+        if self.load_libraries and "compound_components" in self.config:
             for cc_lib_path in self.config["compound_components"]:
                 all_paths.append(cc_lib_path)
-        else:
+        elif self.load_libraries:
             WARN(
                 "No default paths for compound components specified in config"
             )
 
-        # go through each path in the merged list
-        input_file_info = {}
+        # find the input files in each path of the merged list
+        file_paths = []
         for path in all_paths:
             if os.path.isfile(path) and path.split(".")[-1] == "yaml":
-                loaded_content_list = self.load_file(path)
-                for loaded_content in loaded_content_list:
-                    if loaded_content["top_key"] not in input_file_info:
-                        input_file_info[loaded_content["top_key"]] = []
-                    input_file_info[loaded_content["top_key"]].append(
-                        loaded_content
-                    )
+                file_paths.append(path)
             elif os.path.isdir(path):
                 for root, directories, file_names in os.walk(path):
                     for file_name in file_names:
                         if file_name.split(".")[-1] == "yaml":
-                            file_path = os.path.join(root, file_name)
-                            loaded_content_list = self.load_file(file_path)
-                            for loaded_content in loaded_content_list:
-                                if (
-                                    loaded_content["top_key"]
-                                    not in input_file_info
-                                ):
-                                    input_file_info[
-                                        loaded_content["top_key"]
-                                    ] = []
-                                input_file_info[
-                                    loaded_content["top_key"]
-                                ].append(loaded_content)
+                            file_paths.append(os.path.join(root, file_name))
             else:
                 ERROR_CLEAN_EXIT("Cannot recognize input path: ", path)
 
+        # load and classify the input files, keeping their order
+        input_file_info = {}
+        for loaded_content_list in self.load_files(file_paths):
+            for loaded_content in loaded_content_list:
+                if loaded_content["top_key"] not in input_file_info:
+                    input_file_info[loaded_content["top_key"]] = []
+                input_file_info[loaded_content["top_key"]].append(
+                    loaded_content
+                )
+
         if "variables" in input_file_info:
             for variable_spec in input_file_info["variables"]:
                 variable_spec["content"][
@@ -86,23 +97,93 @@ class RawInputs2Dicts:
                     variable_spec["content"]["variables"]
                 )
 
+        # parse the architecture first, so that only the component classes that it references
+        # are defined
+        for file_info in input_file_info.get("architecture", []):
+            self.parse_input_file("architecture", file_info)
+        if not self.flatten_arch_spec_dict == {}:
+            self.referenced_class_names = set(
+                self.get_referenced_class_names(
+                    self.get_unparsed_cc_classes(
+                        input_file_info.get("compound_components", [])
+                    )
+                )
+            )
+
         for top_key, top_key_file_list in input_file_info.items():
-            if top_key != "variables":
+            if top_key not in ("variables", "architecture"):
                 for file_info in top_key_file_list:
-                    YAML_parser_fname = top_key + "_input_parser"
-                    file_path = file_info["path"]
-                    INFO("Parsing file %s for %s info" % (file_path, top_key))
-                    getattr(self, YAML_parser_fname)(file_info)
+                    self.parse_input_file(top_key, file_info)
 
         # construct primitive classes dictionary
-        self.primitive_classes_input_parser()
+        if self.load_libraries:
+            self.primitive_classes_input_parser()
+
+    def parse_input_file(self, top_key, file_info):
+        YAML_parser_fname = top_key + "_input_parser"
+        file_path = file_info["path"]
+        INFO("Parsing file %s for %s info" % (file_path, top_key))
+        getattr(self, YAML_parser_fname)(file_info)
+
+    @staticmethod
+    def get_unparsed_cc_classes(file_info_list):
+        """compound component classes by name, as loaded and before their syntax is checked"""
+        cc_classes = {}
+        for file_info in file_info_list:
+            content = file_info["content"]["compound_components"]
+            classes = content.get("classes") if isinstance(content, dict) else None
+            for cc_class in classes if isinstance(classes, list) else []:
+                if isinstance(cc_class, dict) and "name" in cc_class:
+                    cc_classes[cc_class["name"]] = cc_class
+        return cc_classes
+
+    def load_files(self, file_paths):
+        """
+        load_file for each file, with up to self.jobs worker processes. Workers send their parsed
+        files back to this process, so they are only used if there are several files to share
+        and no other threads (e.g. plug-in calls that timed out), which forking would copy in
+        whatever state they are in.
+        """
+        jobs = self.jobs
+        if jobs > 1 and threading.active_count() > 1:
+            INFO("Other threads are running. Loading input files with one job.")
+            jobs = 1
+        if jobs <= 1 or len(file_paths) <= 1:
+            return [self.load_file(file_path) for file_path in file_paths]
+
+        def load_file_in_worker(file_path):
+            cache = get_parsed_yaml_cache()
+            cache_start = cache.get_statistics() if cache is not None else None
+            loaded_content_list = self.load_file(file_path)
+            # Worker processes send back their parsed input cache statistics
+            return loaded_content_list, (
+                cache.pop_statistics(cache_start) if cache is not None else None
+            )
+
+        loaded = []
+        for loaded_content_list, cache_statistics in map_in_process_pool(
+            load_file_in_worker, file_paths, jobs
+        ):
+            if cache_statistics is not None:
+                get_parsed_yaml_cache().add_statistics(cache_statistics)
+            loaded.append(loaded_content_list)
+        return loaded
 
     def load_file(self, file_path):
         if ".yaml" in file_path:
-            file = load_yaml(file_path)
+            with open(file_path, "r") as f:
+                top_keys = get_top_keys(f.read())
+            if top_keys is not None and not top_keys & self.needed_top_keys:
+                INFO(
+                    "Skipping file %s, which has no top keys needed for the "
+                    "requested outputs" % file_path
+                )
+                return []
+            fast = bool(top_keys) and top_keys <= self.fast_load_top_keys
+            file = load_yaml(file_path, fast=fast)
             loaded_content_list = []
             for top_key in (file or {}).keys():
-                if top_key in self.possible_top_keys:
+                if top_key in self.needed_top_keys:
                     # YAML_parser_fname = top_key + '_input_parser'
                     loaded_content_list.append(
                         {
@@ -329,7 +410,7 @@ class RawInputs2Dicts:
         top_key = "compound_components"
 
         file_path = file_info["path"]
-        content = load_yaml(file_path)
+        content = file_info["content"]
 
         # check top level syntax, check parser version
         ASSERT_MSG(
@@ -349,6 +430,11 @@ class RawInputs2Dicts:
         # check syntax of each specified cc class and add into the cc_class_dict
         cc_classes_list = content[top_key]["classes"]
         for cc_class in cc_classes_list:
+            if (
+                self.referenced_class_names is not None
+                and cc_class.get("name") not in self.referenced_class_names
+            ):
+                continue
             for needed_key in [
                 "name",
                 "attributes",
@@ -413,7 +499,7 @@ class RawInputs2Dicts:
                                 subcomponent_action[
                                     "action_share"
                                 ] = 1  # default action share is 1
-            self.cc_classes_dict[cc_class["name"]] = deepcopy(cc_class)
+            self.cc_classes_dict[cc_class["name"]] = cc_class
 
     def construct_parse_config_file(self, update_config_version):
         """load exisiting config file content (if any)/ create a default config file"""
@@ -476,31 +562,23 @@ class RawInputs2Dicts:
     def primitive_classes_input_parser(self):
         """construct a dictionary for primitive classes"""
         primitive_class_paths = self.config["primitive_components"]
-        for pc_path in primitive_class_paths:
-            if ".yaml" in pc_path:
-                self.expand_primitive_component_lib_info(pc_path)
-            for root, directories, file_names in os.walk(pc_path):
-                for file_name in file_names:
-                    if ".lib.yaml" in file_name:
-                        pc_path = root + os.sep + file_name
-                        self.expand_primitive_component_lib_info(pc_path)
+        # the index is only stored with the other parsed inputs if they are cached
+        index_dir = None
+        if get_parsed_yaml_cache() is not None:
+            index_dir = get_user_cache_dir("primitive_libraries")
+        self.pc_classes_dict = PrimitiveLibraryIndex(
+            primitive_class_paths, index_dir
+        ).load()
 
         ASSERT_MSG(
             not len(self.pc_classes_dict) == 0,
             "No primitive component class found, "
             "please check if the paths in config file are correct",
         )
-
-    def expand_primitive_component_lib_info(self, pc_path):
-        primitive_component_list = load_yaml(pc_path)
-        for idx in range(len(primitive_component_list["classes"])):
-            pc_description = primitive_component_list["classes"][idx]
-            if pc_description["name"] in self.pc_classes_dict:
-                WARN(f'{pc_description["name"]} redefined in {pc_path}')
-            self.pc_classes_dict[pc_description["name"]] = deepcopy(
-                pc_description
+        if self.referenced_class_names is not None:
+            self.pc_classes_dict = self.pc_classes_dict.subset(
+                self.referenced_class_names
             )
-        INFO("primitive component file parsed: ", pc_path)
 
     def ERT_input_parser(self, file_info):
         top_key = "ERT"
@@ -614,8 +692,9 @@ class RawInputs2Dicts:
         return self.flatten_arch_spec_dict
 
     def get_pc_classses(self):
+        # the classes may all be filtered out, but the libraries must have been loaded
         ASSERT_MSG(
-            not self.pc_classes_dict == {},
+            self.load_libraries,
             "Cannot get primitive component class from raw inputs",
         )
         return self.pc_classes_dict
@@ -627,6 +706,29 @@ class RawInputs2Dicts:
             )
         return self.cc_classes_dict
 
+    def get_referenced_class_names(self, cc_classes=None):
+        """names of the classes of the architecture components, and of the classes that their
+        compound classes (by default, the parsed ones) use for subcomponents, in the order that
+        they are first referenced"""
+        cc_classes = self.cc_classes_dict if cc_classes is None else cc_classes
+        class_names = OrderedDict()
+        to_visit = deque(
+            cinfo.get("subclass", cinfo.get("class"))
+            for cinfo in self.get_flatten_arch_spec_dict()["components"].values()
+        )
+        while to_visit:
+            class_name = to_visit.popleft()
+            if class_name is None or class_name in class_names:
+                continue
+            class_names[class_name] = None
+            if class_name in cc_classes:
+                to_visit.extend(
+                    subcomponent_info.get("class")
+                    for subcomponent_info in cc_classes[class_name].get("subcomponents") or []
+                    if isinstance(subcomponent_info, dict)
+                )
+        return list(class_names)
+
     def get_estimation_plug_in_paths(self):
         ASSERT_MSG(
             self.config is not None and "estimator_plug_ins" in self.config,
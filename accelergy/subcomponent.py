@@ -6,6 +6,12 @@ class Subcomponent:
         if 'attributes' not in self.dict_reprsentation:
             self.dict_reprsentation['attributes'] = {}
 
+    def copy(self):
+        """ Returns a copy whose name, attributes, and area share can be set independently """
+        comp_def = dict(self.dict_reprsentation)
+        comp_def['attributes'] = dict(comp_def['attributes'])
+        return Subcomponent(comp_def)
+
     def set_name(self, name):
         self.dict_reprsentation['name'] = name
 
@@ -11,6 +11,9 @@ class SystemState():
         self.pcs = {}
         self.action_counts = None
         self.plug_ins = []
+        self.estimation_cache = None
+        self.estimation_memo = None
+        self.plug_in_profiler = None
         self.ERT = None
         self.ART = None
         self.parser_version = None
@@ -62,6 +65,15 @@ class SystemState():
                     ERROR_CLEAN_EXIT(f'Plug-in {plug_in.get_name()} is not initialized. Please ' \
                                      f'call super().__init__() in the plug-in\'s __init__ method.')
 
+    def set_estimation_cache(self, estimation_cache):
+        self.estimation_cache = estimation_cache
+
+    def set_estimation_memo(self, estimation_memo):
+        self.estimation_memo = estimation_memo
+
+    def set_plug_in_profiler(self, plug_in_profiler):
+        self.plug_in_profiler = plug_in_profiler
+
     def set_ERT(self, ERT):
         self.ERT = ERT
 
@@ -1,6 +1,7 @@
+import contextvars
 import logging
 import queue
-from typing import Callable, List, Union
+from typing import Any, Callable, List, Tuple, Union
 from logging.handlers import QueueHandler, QueueListener
 
 logging.basicConfig(
@@ -8,10 +9,58 @@ logging.basicConfig(
     datefmt='%Y-%m-%d %H:%M:%S',
 )
 logging.getLogger().setLevel(logging.INFO)
+logging.getLogger('asyncio').setLevel(logging.WARNING) # Event loop debug noise
 FORMATTED = '2023-01-12 17:00:59 LEVEL:'
 
 LOG_QUEUES = {}
 NAME2LOGGER = {}
+# When set, messages to queued loggers go to this list instead of their queues. Concurrent plug-in
+# calls each set their own list so their messages are not mixed.
+CAPTURED_MESSAGES = contextvars.ContextVar('CAPTURED_MESSAGES', default=None)
+
+class CaptureFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        captured = CAPTURED_MESSAGES.get()
+        if captured is None:
+            return True
+        captured.append(record)
+        return False
+
+def call_capturing_messages(func: Callable, *args, **kwargs):
+    """ Calls func with messages to queued loggers captured for pop_all_messages. """
+    token = CAPTURED_MESSAGES.set([])
+    try:
+        return func(*args, **kwargs)
+    finally:
+        CAPTURED_MESSAGES.reset(token)
+
+def call_capturing_records(func: Callable, *args, **kwargs) -> Tuple[Any, List[logging.LogRecord]]:
+    """
+    Calls func and returns its result and the records it logged to queued loggers. The records can
+    be logged later with replay_records. If func raises, the records are replayed immediately.
+    """
+    captured = []
+    token = CAPTURED_MESSAGES.set(captured)
+    try:
+        result = func(*args, **kwargs)
+    except BaseException:
+        CAPTURED_MESSAGES.reset(token)
+        replay_records(captured)
+        raise
+    CAPTURED_MESSAGES.reset(token)
+    return result, captured
+
+def replay_records(records: List[logging.LogRecord]):
+    for record in records:
+        logging.getLogger(record.name).handle(record)
+
+async def await_capturing_messages(func: Callable, *args, **kwargs):
+    """ Awaits func with messages to queued loggers captured for pop_all_messages. """
+    token = CAPTURED_MESSAGES.set([])
+    try:
+        return await func(*args, **kwargs)
+    finally:
+        CAPTURED_MESSAGES.reset(token)
 
 def queue_from_logger(logger: Union[logging.Logger, str]) -> List[str]:
     if isinstance(logger, str) and logger in LOG_QUEUES:
@@ -31,6 +80,7 @@ def get_logger(name: str) -> logging.Logger:
     if name not in LOG_QUEUES:
         LOG_QUEUES[name] = queue.Queue()
         logger.addHandler(logging.handlers.QueueHandler(LOG_QUEUES[name]))
+        logger.addFilter(CaptureFilter())
     return logger
 
 def move_queue_from_one_logger_to_another(
@@ -43,6 +93,11 @@ def move_queue_from_one_logger_to_another(
         dest_queue.put(src_queue.get())
 
 def pop_all_messages(logger: Union[logging.Logger, str]) -> List[str]:
+    captured = CAPTURED_MESSAGES.get()
+    if captured is not None:
+        messages = [r.getMessage() for r in captured]
+        captured.clear()
+        return messages
     messages = messages_from_logger(logger)
     queue_from_logger(logger).queue.clear()
     return messages
@@ -0,0 +1,97 @@
+import logging
+import multiprocessing
+import queue
+from concurrent.futures import ProcessPoolExecutor
+from logging.handlers import QueueHandler
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+from accelergy.utils.logging import LOG_QUEUES, get_logger
+from accelergy.utils.utils import WARN
+
+# Set in the parent before the pool forks so workers inherit it. Functions and their closures
+# (plug-ins, queries) are never pickled; only the inputs and results are.
+WORKER_FUNCTION = None
+WORKER_LOG_QUEUE = None
+WARNED_NO_FORK = False
+
+
+def fork_available() -> bool:
+    return 'fork' in multiprocessing.get_all_start_methods()
+
+
+def _init_worker():
+    """ Capture everything logged to the root logger so the parent can re-emit it in order. """
+    global WORKER_LOG_QUEUE
+    WORKER_LOG_QUEUE = queue.Queue()
+    logging.getLogger().handlers = [QueueHandler(WORKER_LOG_QUEUE)]
+
+
+def _drain(q: queue.Queue) -> List[logging.LogRecord]:
+    records = []
+    while True:
+        try:
+            records.append(q.get_nowait())
+        except queue.Empty:
+            return records
+
+
+def _run_in_worker(item: Any) -> Tuple[Any, BaseException, List, Dict[str, List]]:
+    result, error = None, None
+    try:
+        result = WORKER_FUNCTION(item)
+    except (Exception, SystemExit) as e:
+        error = e
+    # Messages that plug-ins logged but that were not consumed go back to the parent's queues
+    leftover = {name: _drain(q) for name, q in LOG_QUEUES.items()}
+    leftover = {name: records for name, records in leftover.items() if records}
+    return result, error, _drain(WORKER_LOG_QUEUE), leftover
+
+
+def _reemit(records: List[logging.LogRecord], leftover: Dict[str, List[logging.LogRecord]]):
+    for record in records:
+        logger = logging.getLogger() if record.name == 'root' else logging.getLogger(record.name)
+        logger.handle(record)
+    for name, queued in leftover.items():
+        get_logger(name)
+        for record in queued:
+            LOG_QUEUES[name].put(record)
+
+
+def map_in_process_pool(function: Callable, items: Sequence, jobs: int) -> List[Any]:
+    """
+    Returns [function(i) for i in items], computed by up to "jobs" forked worker processes.
+
+    Results are returned in the order of items. Log records from each call are sent back to the
+    parent and emitted in the same order, so logs do not interleave between workers. If a call
+    raises or exits, its logs are emitted and the error is raised in the parent. Falls back to
+    running in this process if jobs <= 1 or the platform can't fork.
+    """
+    global WORKER_FUNCTION, WARNED_NO_FORK
+    if jobs > 1 and not fork_available():
+        if not WARNED_NO_FORK:
+            WARN(f'Parallel jobs require the "fork" start method, which is not available on this '
+                 f'platform. Running with one job.')
+            WARNED_NO_FORK = True
+        jobs = 1
+    if jobs <= 1 or len(items) <= 1:
+        return [function(i) for i in items]
+
+    WORKER_FUNCTION = function
+    results = []
+    executor = ProcessPoolExecutor(
+        max_workers=min(jobs, len(items)),
+        mp_context=multiprocessing.get_context('fork'),
+        initializer=_init_worker,
+    )
+    try:
+        chunksize = max(1, len(items) // (jobs * 4))
+        for result, error, records, leftover in executor.map(_run_in_worker, items, chunksize=chunksize):
+            _reemit(records, leftover)
+            if error is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+                raise error
+            results.append(result)
+    finally:
+        executor.shutdown(wait=True)
+        WORKER_FUNCTION = None
+    return results
@@ -22,7 +22,9 @@ import logging
 import os, sys
 
 from copy import deepcopy
-from typing import List
+import functools
+from functools import cached_property
+from typing import List, Optional, Tuple, Union
 
 import logging
 
@@ -75,16 +77,78 @@ def ASSERT_MSG(expression, msg):
         ERROR_CLEAN_EXIT(msg)
 
 
+# Number of parsed component names that are kept for reuse
+COMPONENT_NAME_CACHE_SIZE = 2 ** 16
+
+
+class ComponentName:
+    """
+    A component name split into its base name and the ranges or indices in its brackets, e.g.
+    "PE[0..15].buf[2]" has base name "PE.buf" and indices ((0, 15), 2). get() returns the same
+    object for the same name while it is among the most recently used names.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.base_name = ComponentName.parse_base_name(name)
+
+    @staticmethod
+    @functools.lru_cache(maxsize=COMPONENT_NAME_CACHE_SIZE)
+    def get(name: str) -> "ComponentName":
+        return ComponentName(name)
+
+    @staticmethod
+    def parse_base_name(name: str) -> Optional[str]:
+        """Removes the brackets, or returns None if they are not closed"""
+        while "[" in name or "]" in name:
+            if "[" not in name or "]" not in name:
+                return None
+            name = name[: name.find("[")] + name[name.find("]") + 1 :]
+        return name
+
+    @cached_property
+    def indices(self) -> Tuple[Union[int, Tuple[int, int]], ...]:
+        """(start, end) for each range and the index for each index in the brackets"""
+        indices = []
+        name = self.name
+        while "]" in name:
+            in_brackets = name[name.find("[") + 1 : name.find("]")]
+            if ".." in in_brackets:
+                indices.append(tuple(int(i) for i in in_brackets.split("..")[:2]))
+            else:
+                indices.append(int(in_brackets))
+            name = name[name.find("]") + 1 :]
+        return tuple(indices)
+
+    @cached_property
+    def multiplicity(self) -> int:
+        """Number of identical components that the name refers to"""
+        multiplicity = 1
+        for index in self.indices:
+            if isinstance(index, tuple):
+                multiplicity *= index[1] - index[0] + 1
+        return multiplicity
+
+    def within(self, reference: "ComponentName") -> bool:
+        """Checks that every index and range is within the range of the reference name"""
+        if "[" not in self.name:
+            return True
+        ASSERT_MSG(
+            len(reference.indices) == len(self.indices),
+            "subcomp name %s missing index specifications (should agree with the format %s"
+            % (self.name, reference.name),
+        )
+        for index, ref_index in zip(self.indices, reference.indices):
+            start, end = index if isinstance(index, tuple) else (index, index)
+            ref_min, ref_max = ref_index if isinstance(ref_index, tuple) else (ref_index, ref_index)
+            if start < ref_min or end > ref_max:
+                return False
+        return True
+
+
 def remove_brackets(name):
     """Removes the brackets from a component name in a list"""
-    if "[" not in name and "]" not in name:
-        return name
-    if "[" in name and "]" in name:
-        start_idx = name.find("[")
-        end_idx = name.find("]")
-        name = name[:start_idx] + name[end_idx + 1 :]
-        name = remove_brackets(name)
-        return name
+    return ComponentName.get(name).base_name
 
 
 def indent_list_text_block(prefix: str, list_to_print: List[str]):
@@ -95,6 +159,14 @@ def indent_list_text_block(prefix: str, list_to_print: List[str]):
     )
 
 
+def get_user_cache_dir(name: str) -> str:
+    """Returns $XDG_CACHE_HOME/accelergy/<name>, defaulting to ~/.cache"""
+    cache_home = os.environ.get("XDG_CACHE_HOME", "") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(cache_home, "accelergy", name)
+
+
 def get_config_file_path() -> str:
     possible_config_dirs = [
         "." + os.sep,
@@ -19,13 +19,18 @@
 # SOFTWARE.
 
 import functools
+import hashlib
 import os
 import glob
+import pickle
 import re
 import io
-from typing import Callable, List, Dict, Any, Set, Union, OrderedDict
+import sys
+import tempfile
+from typing import Callable, List, Dict, Any, Set, Tuple, Union, OrderedDict
 import ruamel.yaml
 import accelergy.utils.utils as utils
+import accelergy.version as version
 import warnings
 from ruamel.yaml.error import ReusedAnchorWarning
 
@@ -35,6 +40,42 @@ yaml.indent(mapping=4, sequence=4, offset=2)
 yaml.preserve_quotes = True
 warnings.simplefilter("ignore", ReusedAnchorWarning)
 
+# The cache that parsed files are stored in and loaded from, or None if parsed files are not cached
+PARSED_YAML_CACHE = None
+
+# Loads inputs that are only read, such as large action counts and ERTs, several times faster
+# than the round-trip loader. Uses the C-backed parser if ruamel.yaml.clib is installed.
+fast_yaml = ruamel.yaml.YAML(typ="safe", pure=False)
+
+
+class _AccelergySafeConstructor(ruamel.yaml.constructor.SafeConstructor):
+    """Safe constructor with Accelergy's constructors, which are registered
+    here so that other users of ruamel.yaml's SafeConstructor are unaffected"""
+
+
+fast_yaml.Constructor = _AccelergySafeConstructor
+
+# Files that load_yaml is loading, innermost last, as (directory, fast, read paths). Files included
+# with the !include and !includedir tags are loaded relative to the directory of the file that
+# includes them, and their paths are recorded with that file's.
+LOADING = []
+
+
+def get_loader(fast: bool) -> ruamel.yaml.YAML:
+    """
+    Returns the shared loader, or a new one for a file that is included while another file is
+    being loaded, since a loader can't load two files at once
+    """
+    if not LOADING:
+        return fast_yaml if fast else yaml
+    if fast:
+        loader = ruamel.yaml.YAML(typ="safe", pure=False)
+        loader.Constructor = _AccelergySafeConstructor
+    else:
+        loader = ruamel.yaml.YAML(typ="rt")
+        loader.preserve_quotes = True
+    return loader
+
 
 def recursive_mutator_stop(func):
     cache = set()
@@ -58,11 +99,14 @@ def recursive_mutator_stop(func):
     return wrapper
 
 
-def load_file_and_includes(path: str, string: Union[str, None] = None) -> str:
+def load_file_and_includes(
+    path: str, string: Union[str, None] = None, read_paths: List[str] = None
+) -> str:
     """
     Load a YAML file and recursively load any included YAML files
     :param path: string that specifies the path of the YAML file to be loaded
     :param string: string that contains the YAML content to be loaded
+    :param read_paths: list that the paths of all read files are appended to
     :return: string that contains the loaded YAML content
     """
     assert (string is None) != (
@@ -71,11 +115,13 @@ def load_file_and_includes(path: str, string: Union[str, None] = None) -> str:
     if string is None:
         with open(path, "r") as f:
             string = f.read()
+        if read_paths is not None:
+            read_paths.append(path)
     if "!include" not in string:
         return string
     if "\n" not in string:
         return load_file_and_includes(
-            os.path.join(os.path.dirname(path), string), None
+            os.path.join(os.path.dirname(path), string), None, read_paths
         )
     else:
         lines = [s + "\n" for s in string.split("\n")]
@@ -87,7 +133,9 @@ def load_file_and_includes(path: str, string: Union[str, None] = None) -> str:
         len_whitespace = len(l) - len(l.lstrip())
         s = re.sub(r"^\s*!include(dir)?", "", l).strip()
         s = re.sub(r"^\s*:\s*", "", s)
-        replace = "\n" + load_file_and_includes(os.path.join(basename, s))
+        replace = "\n" + load_file_and_includes(
+            os.path.join(basename, s), None, read_paths
+        )
         replace = replace.replace("\n", "\n" + " " * len_whitespace) + "\n"
         lines[i] = replace
     return "".join(lines)
@@ -111,21 +159,185 @@ def merge_check(x: Union[Dict[str, Any], List[Any], Any]) -> None:
     return x
 
 
+# Unindented "key:" lines, which are the keys of a block mapping at the top level
+TOP_KEY_REGEX = re.compile(r"^([A-Za-z_][\w.\-]*)[ \t]*:(?:[ \t]|$)", re.MULTILINE)
+# Unindented lines that are not keys, comments, or document markers, such as
+# quoted keys or flow and sequence documents
+OTHER_TOP_LINE_REGEX = re.compile(
+    r"^(?![A-Za-z_][\w.\-]*[ \t]*:(?:[ \t]|$)|#|(?:---|\.\.\.)[ \t]*(?:#.*)?$)\S",
+    re.MULTILINE,
+)
+
+
+def get_top_keys(string: str) -> Union[Set[str], None]:
+    """
+    Find the top-level keys of a YAML document without parsing it
+    :param string: string that contains the YAML content
+    :return: set of top-level keys, or None if they can't be found without
+             parsing (e.g. the document includes other files)
+    """
+    if "!include" in string or OTHER_TOP_LINE_REGEX.search(string):
+        return None
+    return set(TOP_KEY_REGEX.findall(string))
+
+
 def load_yaml(
-    path: str = None, string: str = None
+    path: str = None, string: str = None, fast: bool = False
 ) -> Union[Dict[str, Any], None]:
     """
     Load YAML content from a file or string
     :param path: string that specifies the path of the YAML file to be loaded
     :param string: string that contains the YAML content to be loaded
+    :param fast: load with the safe loader. Quoted strings keep their quoted
+                 string types, but comments and formatting are not kept, so
+                 files that are written back must not be loaded this way.
     :return: parsed YAML content
     """
     assert (string is None) != (
         path is None
     ), "Must specify either path or string, but not both."
-    # Recursively parse through x, replacing any <<< with a recursive merge
-    # print(f'Calling recursive merge check on {x}')
-    return merge_check(yaml.load(load_file_and_includes(path, string)))
+    # Included files are cached as part of the file that includes them
+    use_cache = path is not None and PARSED_YAML_CACHE is not None and not LOADING
+    if use_cache:
+        content = PARSED_YAML_CACHE.get(path, fast)
+        if content is not None:
+            return content
+    loader = get_loader(fast)
+    read_paths = LOADING[-1][2] if LOADING else []
+    LOADING.append((os.path.dirname(path) if path is not None else ".", fast, read_paths))
+    try:
+        # Recursively parse through x, replacing any <<< with a recursive merge
+        content = merge_check(
+            loader.load(load_file_and_includes(path, string, read_paths))
+        )
+    finally:
+        LOADING.pop()
+    if use_cache:
+        PARSED_YAML_CACHE.put(path, fast, read_paths, content)
+    return content
+
+
+def get_file_fingerprint(path: str, with_hash: bool = True) -> Tuple[int, int, str]:
+    """
+    Returns the modification time, size, and (optionally) content hash of a file. The content of
+    a directory is the list of its files.
+    """
+    stat = os.stat(path)
+    digest = ""
+    if with_hash and os.path.isdir(path):
+        listing = "\n".join(sorted(os.listdir(path)))
+        digest = hashlib.sha256(listing.encode("utf-8")).hexdigest()
+    elif with_hash:
+        with open(path, "rb") as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+    return stat.st_mtime_ns, stat.st_size, digest
+
+
+class ParsedYAMLCache:
+    """
+    On-disk cache of parsed YAML files, shared between Accelergy runs, so
+    that unchanged inputs and libraries are not parsed again.
+
+    An entry is keyed on the path of a file, how it was loaded, and the
+    versions of Accelergy, ruamel.yaml, and Python. It stores the modification
+    time, size, and hash of the file and of every file that it includes. It is
+    used if every one of these files has the same modification time and size,
+    or else the same hash. Entries are written atomically, so any number of
+    Accelergy processes may share a cache directory.
+    """
+
+    def __init__(self, cache_dir: str = None):
+        self.cache_dir = os.path.abspath(
+            os.path.expanduser(cache_dir or utils.get_user_cache_dir("parsed"))
+        )
+        self.hits = 0
+        self.misses = 0
+        utils.create_folder(self.cache_dir)
+        utils.INFO(f"Using parsed input cache at {self.cache_dir}")
+
+    def _get_path(self, path: str, fast: bool) -> str:
+        key = (
+            version.__version__,
+            ruamel.yaml.__version__,
+            sys.version_info[:2],
+            os.path.abspath(path),
+            fast,
+        )
+        digest = hashlib.sha256(repr(key).encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, digest + ".pickle")
+
+    @staticmethod
+    def _unchanged(fingerprints: Dict[str, Tuple[int, int, str]]) -> bool:
+        for path, (mtime, size, digest) in fingerprints.items():
+            try:
+                if get_file_fingerprint(path, False)[:2] == (mtime, size):
+                    continue
+                if get_file_fingerprint(path)[2] != digest:
+                    return False
+            except OSError:
+                return False
+        return True
+
+    def get(self, path: str, fast: bool) -> Any:
+        """Returns the parsed content of a file, or None if it is not cached"""
+        try:
+            with open(self._get_path(path, fast), "rb") as f:
+                fingerprints, content = pickle.load(f)
+        except Exception:
+            # Missing, or written by an incompatible version. Either way, a miss.
+            self.misses += 1
+            return None
+        if not self._unchanged(fingerprints):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return content
+
+    def put(self, path: str, fast: bool, read_paths: List[str], content: Any):
+        cache_path = self._get_path(path, fast)
+        tmp_path = None
+        try:
+            fingerprints = {p: get_file_fingerprint(p) for p in read_paths}
+            fd, tmp_path = tempfile.mkstemp(
+                dir=self.cache_dir, prefix=".tmp-", suffix=".pickle"
+            )
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(
+                    (fingerprints, content), f, protocol=pickle.HIGHEST_PROTOCOL
+                )
+            os.replace(tmp_path, cache_path)
+        except (OSError, pickle.PicklingError, TypeError, AttributeError) as e:
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            utils.WARN(f"Could not write to parsed input cache at {cache_path}: {e}")
+
+    def get_statistics(self) -> Tuple[int, int]:
+        return self.hits, self.misses
+
+    def pop_statistics(self, start: Tuple[int, int]) -> Tuple[int, int]:
+        """Resets the hits and misses to start, and returns those since then"""
+        statistics = self.hits - start[0], self.misses - start[1]
+        self.hits, self.misses = start
+        return statistics
+
+    def add_statistics(self, statistics: Tuple[int, int]):
+        self.hits += statistics[0]
+        self.misses += statistics[1]
+
+    def log_statistics(self):
+        utils.INFO(
+            f"Parsed input cache at {self.cache_dir}: {self.hits} hits, "
+            f"{self.misses} misses."
+        )
+
+
+def get_parsed_yaml_cache() -> ParsedYAMLCache:
+    return PARSED_YAML_CACHE
+
+
+def set_parsed_yaml_cache(cache: ParsedYAMLCache):
+    global PARSED_YAML_CACHE
+    PARSED_YAML_CACHE = cache
 
 
 @recursive_mutator_stop
@@ -209,10 +421,12 @@ def include_constructor(
     filepath = self.construct_scalar(node)
     if filepath[-1] == ",":
         filepath = filepath[:-1]
-    return load_yaml(os.path.join(self._root, filepath))
+    root, fast, _ = LOADING[-1]
+    return load_yaml(os.path.join(root, filepath), fast=fast)
 
 
 yaml.constructor.add_constructor("!include", include_constructor)
+_AccelergySafeConstructor.add_constructor("!include", include_constructor)
 
 
 def includedir_constructor(
@@ -228,14 +442,40 @@ def includedir_constructor(
     filepath = self.construct_scalar(node)
     if filepath[-1] == ",":
         filepath = filepath[:-1]
-    dirname = os.path.join(self._root, filepath)
+    root, fast, read_paths = LOADING[-1]
+    dirname = os.path.join(root, filepath)
+    read_paths.append(dirname)  # Adding or removing a file changes the directory
     yamllist = []
     for filename in glob.glob(dirname + "/*.yaml"):
-        yamllist.append(load_yaml(filename))
+        yamllist.append(load_yaml(filename, fast=fast))
     return yamllist
 
 
 yaml.constructor.add_constructor("!includedir", includedir_constructor)
+_AccelergySafeConstructor.add_constructor("!includedir", includedir_constructor)
+
+
+def quoted_str_constructor(
+    self, node: ruamel.yaml.nodes.ScalarNode
+) -> str:
+    """
+    Constructor that records whether a string was quoted in its type, as the
+    round-trip loader does, so that is_quoted_string works on fast-loaded files
+    :param self: YAML constructor object
+    :param node: YAML node object
+    :return: the string, as a quoted string type if it was quoted
+    """
+    value = self.construct_scalar(node)
+    if node.style == '"':
+        return ruamel.yaml.scalarstring.DoubleQuotedScalarString(value)
+    if node.style == "'":
+        return ruamel.yaml.scalarstring.SingleQuotedScalarString(value)
+    return value
+
+
+_AccelergySafeConstructor.add_constructor(
+    "tag:yaml.org,2002:str", quoted_str_constructor
+)
 
 
 @recursive_mutator_stop
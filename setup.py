@@ -21,6 +21,7 @@ setup(
       license='MIT',
       packages=['accelergy'],
       install_requires = ['pyYAML >= 1.1', 'pyfiglet', 'ruamel.yaml >= 0.17.20', 'deepdiff >= 6.2.3'],
+      extras_require = {'numpy': ['numpy']},
       python_requires = '>=3.8',
       data_files=[('share/accelergy/primitive_component_libs',
                     ['share/primitive_component_libs/primitive_component.lib.yaml',
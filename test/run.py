@@ -8,6 +8,9 @@ import tests.exercises.test
 from   tests.basic.test_energy_calculation import TestEnergyCalculation
 from   tests.basic.test_helper_functions import TestHelperFunctions
 from   tests.basic.test_parsing_utils import TestParsingUtils
+from   tests.basic.test_estimation_cache import TestEstimationCache
+from   tests.basic.test_estimator_wrapper import TestEstimatorWrapper
+from   tests.basic.test_compound_component import TestCompoundComponent
 import argparse
 import utils
 
@@ -26,6 +29,9 @@ if __name__ == '__main__':
     suite.addTests(test_loader.loadTestsFromTestCase(TestEnergyCalculation))
     suite.addTests(test_loader.loadTestsFromTestCase(TestHelperFunctions))
     suite.addTests(test_loader.loadTestsFromTestCase(TestParsingUtils))
+    suite.addTests(test_loader.loadTestsFromTestCase(TestEstimationCache))
+    suite.addTests(test_loader.loadTestsFromTestCase(TestEstimatorWrapper))
+    suite.addTests(test_loader.loadTestsFromTestCase(TestCompoundComponent))
     suite.addTests(test_loader.loadTestsFromTestCase(tests.action_area_share.test.Test))
     suite.addTests(test_loader.loadTestsFromTestCase(tests.plugin_choices.test.Test))
     suite.addTests(test_loader.loadTestsFromTestCase(tests.plugin_choices_II.test.Test))
@@ -0,0 +1,109 @@
+import unittest
+
+from accelergy.arch_dict_2_obj import ArchComp
+from accelergy.component_class import ComponentClass
+from accelergy.compound_component import CompoundComponent
+from accelergy.ERT_generator import EnergyReferenceTableGenerator
+from accelergy.plug_in_interface.interface import AccelergyPlugIn, AccuracyEstimation, Estimation
+
+
+class SRAMPlugIn(AccelergyPlugIn):
+    def primitive_action_supported(self, query):
+        return AccuracyEstimation(100 if query.class_name == 'SRAM' else 0)
+
+    def estimate_energy(self, query):
+        return Estimation(3, 'p')
+
+    def primitive_area_supported(self, query):
+        return AccuracyEstimation(0)
+
+    def estimate_area(self, query):
+        return Estimation(0, 'u^2')
+
+    def get_name(self):
+        return 'sram_plug_in'
+
+
+def get_classes():
+    cc_classes = {'smartbuffer': ComponentClass({
+        'name': 'smartbuffer',
+        'attributes': {'depth': 'must_specify', 'width': 'must_specify'},
+        'subcomponents': [
+            {'name': 'storage', 'class': 'SRAM',
+             'attributes': {'depth': 'depth', 'width': 'width', 'n_banks': '2 * 2'}, 'area_share': 1.0},
+            {'name': 'address_generators[0..1]', 'class': 'adder',
+             'attributes': {'width': 'log2(depth)'}, 'area_share': '0.5'},
+        ],
+        'actions': [{'name': 'read', 'subcomponents': [
+            {'name': 'storage', 'actions': [{'name': 'read'}]},
+            {'name': 'address_generators[0]', 'actions': [{'name': 'add', 'action_share': 2}]},
+        ]}],
+    })}
+    return cc_classes, {}
+
+
+def define_component(name, attributes, cc_classes, pc_classes, class_name='smartbuffer'):
+    arch_component = ArchComp({'name': name, 'class': class_name, 'attributes': attributes})
+    return CompoundComponent({'component': arch_component, 'pc_classes': pc_classes,
+                              'cc_classes': cc_classes})
+
+
+class TestCompoundComponent(unittest.TestCase):
+    def test_subcomponent_template_folded(self):
+        """ Constant expressions in subcomponents are evaluated once per class """
+        cc_classes, pc_classes = get_classes()
+        template = cc_classes['smartbuffer'].get_subcomponent_template()
+        self.assertEqual(template['storage'].get_attributes(),
+                         {'depth': 'depth', 'width': 'width', 'n_banks': 4})
+        self.assertEqual(template['address_generators[0..1]'].get_area_share(), 0.5)
+        self.assertEqual(template['address_generators[0..1]'].get_attributes(), {'width': 'log2(depth)'})
+        pe = define_component('PE', {'depth': 1024, 'width': 16}, cc_classes, pc_classes)
+        self.assertEqual(pe.get_subcomponents()['storage'].get_attributes()['n_banks'], 4)
+        self.assertEqual(pe.get_subcomponents()['address_generators[0..1]'].get_attributes(), {'width': 10})
+        self.assertEqual(template['address_generators[0..1]'].get_attributes(), {'width': 'log2(depth)'})
+
+    def test_identical_instances_share_flattening(self):
+        """ Instances with the same attributes are flattened once """
+        cc_classes, pc_classes = get_classes()
+        a = define_component('A', {'depth': 1024, 'width': 16}, cc_classes, pc_classes)
+        b = define_component('B', {'depth': 1024, 'width': 16}, cc_classes, pc_classes)
+        c = define_component('C', {'depth': 1024, 'width': 16.5}, cc_classes, pc_classes)
+        self.assertIs(b.get_actions(), a.get_actions())
+        self.assertIsNot(c.get_actions(), a.get_actions())
+        self.assertIs(b.find_subcomponent_obj('B'), b)
+        self.assertIs(b.find_subcomponent_obj('storage'), a.find_subcomponent_obj('storage'))
+        self.assertEqual([(n, act.get_name(), act.get_action_share())
+                          for n, act in b.get_actions()[0].get_primitive_list()],
+                         [('storage', 'read', 1.0), ('address_generators[0]', 'add', 2.0)])
+        self.assertEqual(c.get_subcomponents()['storage'].get_attributes()['width'], 16.5)
+
+    def test_flattening_shares_class_actions(self):
+        """ Defining actions creates new actions and leaves the class's actions unchanged """
+        cc_classes, pc_classes = get_classes()
+        class_action = cc_classes['smartbuffer'].get_action('read')
+        a = define_component('A', {'depth': 1024, 'width': 16}, cc_classes, pc_classes)
+        action = a.get_actions()[0]
+        self.assertIsNot(action, class_action)
+        self.assertIs(action.get_subcomps(), class_action.get_subcomps())
+        self.assertIsNone(class_action.get_primitive_list())
+        self.assertEqual(class_action.get_subactions('address_generators[0]')[0].get_action_share(), 2)
+
+    def test_primitive_type_ERT(self):
+        """ Compound components with a primitive type are estimated as that primitive """
+        cc_classes, pc_classes = get_classes()
+        cc_classes['sram_buffer'] = ComponentClass({
+            'name': 'sram_buffer', 'primitive_type': 'SRAM',
+            'attributes': {'depth': 'must_specify', 'width': 'must_specify'},
+            'subcomponents': [{'name': 'storage', 'class': 'SRAM', 'attributes': {}, 'area_share': 1.0}],
+            'actions': [{'name': 'read', 'subcomponents': [{'name': 'storage', 'actions': [{'name': 'read'}]}]}],
+        })
+        buffer = define_component('buffer', {'depth': 64, 'width': 8}, cc_classes, pc_classes, 'sram_buffer')
+        ERT = EnergyReferenceTableGenerator({'pcs': {}, 'ccs': {'buffer': buffer}, 'parser_version': '0.4',
+                                             'precision': 3, 'plug_ins': [SRAMPlugIn()]}).get_ERT()
+        ERT_entry = ERT.get_ERT_entry('buffer')
+        self.assertEqual(ERT_entry.action_entries['read'][0]['energy'], 3)
+        self.assertEqual(ERT_entry.estimator_s, {'buffer': {'estimator': 'sram_plug_in'}})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,7 +4,7 @@ import pkg_resources
 from accelergy.raw_inputs_2_dicts import RawInputs2Dicts
 from accelergy.ERT_generator import ERT_dict_to_obj
 from accelergy.action_counts_dict_2_obj import action_counts_dict_2_obj
-from accelergy.energy_calculator import EnergyCalculator
+from accelergy.energy_calculator import EnergyCalculator, EnergyEvaluator
 
 class TestEnergyCalculation(unittest.TestCase):
 
@@ -101,6 +101,89 @@ class TestEnergyCalculation(unittest.TestCase):
         self.assertEqual(float(mac_energy), float(250))
         self.assertEqual(float(scrachpad_energy),float(1150*3 + 24*7))
 
+    def test_ERTindex(self):
+        """ argument combinations are indexed by action name and arguments in any order """
+        desired_ERT_obj = ERT_dict_to_obj(
+            {'ERT_dict': self.desired_ERT_dict, 'parser_version': self.version, 'precision': 3})
+        scratchpad_entry = desired_ERT_obj.get_ERT_entry('design.scratchpad[1]')
+        position = scratchpad_entry.combination_index[('fill', (('address_delta', 1), ('data_delta', 0)))]
+        self.assertEqual(scratchpad_entry.action_entries['fill'][position]['energy'], 5)
+        self.assertEqual(scratchpad_entry.find_combination('fill', {'data_delta': 0, 'address_delta': 1}), position)
+        self.assertEqual(desired_ERT_obj.get_ERT_entry('design.mac').combination_index[('idle', None)], 0)
+        counts = action_counts_dict_2_obj({'design.scratchpad[2]': [
+            {'name': 'read', 'arguments': {'data_delta': 1, 'address_delta': 1}, 'counts': 1}]})
+        action_count_obj = counts.get_action_counts()['design.scratchpad[2]'][0]
+        self.assertEqual(desired_ERT_obj.get_action_energy('design.scratchpad[2]', action_count_obj), 8)
+
+    def test_argumentMatching(self):
+        """ every argument of an action count must match, not only the last one """
+        ERT_obj = ERT_dict_to_obj({'ERT_dict': {'buffer': {'read': [
+            {'arguments': {'a': 0, 'b': 'x'}, 'energy': 1}, {'arguments': {'a': 1, 'b': 'x'}, 'energy': 2}]}},
+            'parser_version': self.version, 'precision': 3})
+        counts = action_counts_dict_2_obj({'buffer': [{'name': 'read', 'arguments': {'a': 1}, 'counts': 1},
+                                                      {'name': 'read', 'arguments': {'a': 2, 'b': 'x'}, 'counts': 1}]})
+        subset, missing = counts.get_action_counts()['buffer']
+        self.assertEqual(ERT_obj.get_action_energy('buffer', subset), 2)
+        with self.assertRaises(SystemExit):
+            ERT_obj.get_action_energy('buffer', missing)
+
+    def test_energyEvaluator(self):
+        """ a compiled ERT gives the same energies as the energy calculator, for one or many count vectors """
+        desired_ERT_obj = ERT_dict_to_obj(
+            {'ERT_dict': self.desired_ERT_dict, 'parser_version': self.version, 'precision': 3})
+        desired_action_counts_obj = action_counts_dict_2_obj(self.desired_action_counts_dict)
+        energy_calculator = EnergyCalculator({'action_counts': desired_action_counts_obj,
+                                              'ERT': desired_ERT_obj,
+                                              'parser_version': self.version})
+        evaluator = EnergyEvaluator(desired_ERT_obj)
+        self.assertEqual(len(evaluator.columns), 13)
+        self.assertEqual(evaluator.columns[evaluator.get_column('design.scratchpad[1]', 'read', {'data_delta': 1, 'address_delta': 0})],
+                         ('design.scratchpad[0..2]', 'read', {'address_delta': 0, 'data_delta': 1}))
+        counts = evaluator.get_counts_vector(desired_action_counts_obj)
+        total, component_energies = evaluator.evaluate(counts)
+        self.assertEqual(float(total), float(energy_calculator.energy_estimates.total_design_energy))
+        self.assertEqual([float(e) for e in component_energies], [250.0, 1150*3 + 24*7])
+
+        totals, batch_component_energies = evaluator.evaluate([list(counts), [2 * c for c in counts]])
+        self.assertEqual([float(t) for t in totals], [float(total), 2 * float(total)])
+        self.assertEqual([float(e) for e in batch_component_energies[1]], [500.0, 2 * (1150*3 + 24*7)])
+
+    def test_sharedBaseName(self):
+        """ the last ERT entry with a base name is used, as in the base name map """
+        ERT_obj = ERT_dict_to_obj({'ERT_dict': {'buffer[0..1]': {'read': [{'arguments': None, 'energy': 1}]},
+                                                'buffer[0..3]': {'read': [{'arguments': None, 'energy': 2}]}},
+                                   'parser_version': self.version, 'precision': 3})
+        action_counts_obj = action_counts_dict_2_obj({'buffer[3]': [{'name': 'read', 'counts': 10}]})
+        self.assertEqual(ERT_obj.get_action_energy('buffer[3]', action_counts_obj.get_action_counts()['buffer[3]'][0]), 2)
+        energy_calculator = EnergyCalculator({'action_counts': action_counts_obj, 'ERT': ERT_obj,
+                                              'parser_version': self.version})
+        evaluator = EnergyEvaluator(ERT_obj)
+        total, component_energies = evaluator.evaluate(evaluator.get_counts_vector(action_counts_obj))
+        self.assertEqual(float(total), float(energy_calculator.energy_estimates.total_design_energy))
+        self.assertEqual([float(e) for e in component_energies], [0.0, 20.0])
+
+    def test_energyEvaluatorMatchesCalculator(self):
+        """ the evaluator checks component ranges and resolves missing or partial arguments as the ERT does """
+        ERT_obj = ERT_dict_to_obj({'ERT_dict': {'buf[0..3]': {
+            'read': [{'arguments': {'a': 0, 'b': 0}, 'energy': 1}, {'arguments': {'a': 1, 'b': 0}, 'energy': 2}],
+            'idle': [{'arguments': None, 'energy': 0}]}}, 'parser_version': self.version, 'precision': 3})
+        action_counts_obj = action_counts_dict_2_obj({'buf[1]': [
+            {'name': 'read', 'counts': 10}, {'name': 'read', 'arguments': {'a': 1}, 'counts': 100},
+            {'name': 'read', 'arguments': {'b': 0, 'a': 1}, 'counts': 1000}, {'name': 'idle', 'counts': 5}]})
+        energy_calculator = EnergyCalculator({'action_counts': action_counts_obj, 'ERT': ERT_obj,
+                                              'parser_version': self.version})
+        evaluator = EnergyEvaluator(ERT_obj)
+        total, component_energies = evaluator.evaluate(evaluator.get_counts_vector(action_counts_obj))
+        self.assertEqual(float(energy_calculator.energy_estimates.total_design_energy), 2210.0)
+        self.assertEqual(float(total), 2210.0)
+        self.assertEqual([float(e) for e in component_energies], [2210.0])
+
+        out_of_range = action_counts_dict_2_obj({'buf[9]': [{'name': 'idle', 'counts': 1}]})
+        with self.assertRaises(SystemExit):
+            EnergyCalculator({'action_counts': out_of_range, 'ERT': ERT_obj, 'parser_version': self.version})
+        with self.assertRaises(SystemExit):
+            evaluator.get_counts_vector(out_of_range)
+
     def test_wrongActionCounts(self):
         """ test if wrong component name in action count will result in error"""
 
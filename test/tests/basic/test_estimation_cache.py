@@ -0,0 +1,374 @@
+import asyncio
+import os
+import tempfile
+import time
+import unittest
+
+from accelergy.plug_in_interface.interface import *
+from accelergy.plug_in_interface.estimation_cache import EstimationCache
+from accelergy.plug_in_interface.plug_in_profiler import PlugInProfiler, set_profiler
+from accelergy.plug_in_interface.query_plug_ins import EstimationMemo, PlugInIndex, get_best_estimates, \
+    get_best_estimates_async
+from accelergy.plug_in_interface.watchdog import Watchdog, set_watchdog
+
+
+class CachedPlugIn(AccelergyPlugIn):
+    def primitive_action_supported(self, query):
+        return AccuracyEstimation(100)
+
+    def estimate_energy(self, query):
+        return Estimation(1, 'p')
+
+    def primitive_area_supported(self, query):
+        return AccuracyEstimation(100)
+
+    def estimate_area(self, query):
+        return Estimation(1, 'u^2')
+
+    def get_name(self):
+        return 'cached_plug_in'
+
+
+class CountingPlugIn(CachedPlugIn):
+    def __init__(self):
+        super().__init__()
+        self.num_estimations = 0
+
+    def estimate_energy(self, query):
+        self.num_estimations += 1
+        return super().estimate_energy(query)
+
+
+class AdderOnlyPlugIn(CountingPlugIn):
+    def get_name(self):
+        return 'adder_only_plug_in'
+
+    def get_supported_class_names(self):
+        return ['adder']
+
+
+class NonDeterministicPlugIn(CachedPlugIn):
+    def get_name(self):
+        return 'non_deterministic_plug_in'
+
+    def is_deterministic(self):
+        return False
+
+
+class BatchPlugIn(CachedPlugIn):
+    """ Estimates any width in a batch, but fails for odd widths """
+    def __init__(self, broken=False):
+        super().__init__()
+        self.broken = broken
+        self.batches = []
+
+    def estimate_energy(self, query):
+        if query.class_attrs['width'] % 2:
+            return Estimation(0, success=False)
+        return Estimation(query.class_attrs['width'], 'p')
+
+    def estimate_energy_batch(self, queries):
+        self.batches.append(len(queries))
+        if self.broken:
+            raise RuntimeError('Batch failed')
+        return [self.estimate_energy(q) for q in queries]
+
+    def get_name(self):
+        return 'batch_plug_in'
+
+
+class FallbackPlugIn(CountingPlugIn):
+    def primitive_action_supported(self, query):
+        return AccuracyEstimation(50)
+
+    def get_name(self):
+        return 'fallback_plug_in'
+
+
+class SlowAsyncPlugIn(AsyncAccelergyPlugIn):
+    """ Waits before each estimation and records how many estimations are in flight """
+    def __init__(self):
+        super().__init__()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def primitive_action_supported(self, query):
+        return AccuracyEstimation(100)
+
+    async def estimate_energy(self, query):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        self.logger.info(f'Estimating width {query.class_attrs["width"]}')
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        return Estimation(query.class_attrs['width'], 'p')
+
+    async def primitive_area_supported(self, query):
+        return AccuracyEstimation(0)
+
+    async def estimate_area(self, query):
+        raise NotImplementedError()
+
+    def get_name(self):
+        return 'slow_async_plug_in'
+
+
+class SleepingPlugIn(CachedPlugIn):
+    """ Takes too long to estimate """
+    def estimate_energy(self, query):
+        time.sleep(0.5)
+        return super().estimate_energy(query)
+
+    def get_name(self):
+        return 'sleeping_plug_in'
+
+
+class SleepingAsyncPlugIn(SlowAsyncPlugIn):
+    async def estimate_energy(self, query):
+        await asyncio.sleep(0.5)
+        return Estimation(1, 'p')
+
+
+class AccuracyCheckingPlugIn(CachedPlugIn):
+    """ Reports a fixed accuracy and counts accuracy checks """
+    def __init__(self, name, accuracy, fails=False):
+        self.name, self.accuracy, self.fails = name, accuracy, fails
+        super().__init__()
+        self.num_checks = 0
+
+    def primitive_action_supported(self, query):
+        self.num_checks += 1
+        return AccuracyEstimation(self.accuracy)
+
+    def estimate_energy(self, query):
+        if self.fails:
+            raise ValueError('Failed')
+        return Estimation(self.accuracy, 'p')
+
+    def get_name(self):
+        return self.name
+
+
+class HookedPlugIn(CachedPlugIn):
+    """ Records its pre- and post-call hooks """
+    def __init__(self):
+        super().__init__()
+        self.hook_calls = []
+
+    def pre_call(self, method_name, query):
+        self.hook_calls.append(('pre', method_name))
+
+    def post_call(self, method_name, query, result, seconds):
+        self.hook_calls.append(('post', method_name, result.value))
+
+
+def make_estimation(value, plug_in):
+    estimation = Estimation(value, 'p')
+    estimation.estimator_name = plug_in.get_name()
+    return estimation
+
+
+class TestEstimationCache(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.plug_in = CachedPlugIn()
+        self.query = {'class_name': 'adder', 'attributes': {'width': 8, 'technology': '45nm'},
+                      'action_name': 'add', 'arguments': None}
+
+    def tearDown(self):
+        self.cache_dir.cleanup()
+
+    def test_canonical_key_ignores_order(self):
+        """ Attribute order does not change the query key, but attribute types do """
+        a = AccelergyQuery('adder', {'width': 8, 'depth': 2})
+        b = AccelergyQuery('adder', {'depth': 2, 'width': 8})
+        c = AccelergyQuery('adder', {'depth': 2, 'width': 8.0})
+        self.assertEqual(a.get_canonical_key(), b.get_canonical_key())
+        self.assertNotEqual(a.get_canonical_key(), c.get_canonical_key())
+
+    def test_persists_between_caches(self):
+        """ An estimation stored by one cache is found by another using the same directory """
+        EstimationCache([self.plug_in], self.cache_dir.name).put(
+            self.query, True, make_estimation(3, self.plug_in))
+        cache = EstimationCache([self.plug_in], self.cache_dir.name)
+        estimation = cache.get(self.query, True)
+        self.assertEqual(estimation.value, 3)
+        self.assertEqual(estimation.estimator_name, 'cached_plug_in')
+        self.assertIsNone(cache.get(self.query, False))
+
+    def test_plug_in_set_invalidates(self):
+        """ Loading a different set of plug-ins invalidates cached estimations """
+        EstimationCache([self.plug_in], self.cache_dir.name).put(
+            self.query, True, make_estimation(3, self.plug_in))
+        cache = EstimationCache([self.plug_in, NonDeterministicPlugIn()], self.cache_dir.name)
+        self.assertIsNone(cache.get(self.query, True))
+
+    def test_non_deterministic_not_stored(self):
+        """ Estimations from non-deterministic plug-ins are not stored """
+        plug_in = NonDeterministicPlugIn()
+        cache = EstimationCache([plug_in], self.cache_dir.name)
+        cache.put(self.query, True, make_estimation(3, plug_in))
+        self.assertIsNone(cache.get(self.query, True))
+
+    def test_lru_eviction(self):
+        """ The cache stays under its size cap and keeps recently-used entries """
+        cache = EstimationCache([self.plug_in], self.cache_dir.name, max_size_mb=0.002)
+        for i in range(50):
+            query = {'class_name': 'adder', 'attributes': {'width': i}}
+            cache.put(query, False, make_estimation(i, self.plug_in))
+        entries, total = cache._scan()
+        self.assertLessEqual(total, cache.max_size_bytes)
+        self.assertIsNotNone(cache.get({'class_name': 'adder', 'attributes': {'width': 49}}, False))
+        self.assertIsNone(cache.get({'class_name': 'adder', 'attributes': {'width': 0}}, False))
+
+    def test_memo_estimates_each_query_once(self):
+        """ Identical queries in one run reach the plug-ins once, regardless of attribute order """
+        plug_in = CountingPlugIn()
+        memo = EstimationMemo([plug_in])
+        reordered = dict(self.query, attributes={'technology': '45nm', 'width': 8})
+        for query in [self.query, reordered, self.query]:
+            self.assertEqual(memo.get_best_estimate(query, True).value, 1)
+        self.assertEqual(plug_in.num_estimations, 1)
+        self.assertEqual((memo.hits, memo.misses), (2, 1))
+
+    def test_memo_prefetch_in_parallel(self):
+        """ Queries estimated by worker processes are reused in order by the serial pass """
+        plug_in = CountingPlugIn()
+        memo = EstimationMemo([plug_in])
+        queries = [dict(self.query, attributes={'width': i % 5}) for i in range(20)]
+        memo.prefetch(queries, True, jobs=3)
+        self.assertEqual(plug_in.num_estimations, 0)  # All estimated in the workers
+        for query in queries:
+            estimation = memo.get_best_estimate(query, True)
+            self.assertEqual((estimation.value, estimation.estimator_name), (1, 'cached_plug_in'))
+        self.assertEqual(plug_in.num_estimations, 0)
+        self.assertEqual((memo.hits, memo.misses), (15, 5))
+
+    def test_batch_estimation(self):
+        """ Batch plug-ins are called once per round, and failed queries fall through """
+        batch_plug_in, fallback = BatchPlugIn(), FallbackPlugIn()
+        queries = [dict(self.query, attributes={'width': i}) for i in range(6)]
+        estimations = get_best_estimates([batch_plug_in, fallback], queries, True)
+        self.assertEqual([e.value for e in estimations], [0, 1, 2, 1, 4, 1])
+        self.assertEqual(batch_plug_in.batches, [6])
+        self.assertEqual(fallback.num_estimations, 3)
+
+    def test_failed_batch_retries_each_query(self):
+        """ If a batch call raises, the single-query method is used """
+        batch_plug_in = BatchPlugIn(broken=True)
+        queries = [dict(self.query, attributes={'width': i}) for i in range(0, 6, 2)]
+        estimations = get_best_estimates([batch_plug_in], queries, True)
+        self.assertEqual([e.value for e in estimations], [0, 2, 4])
+        self.assertEqual(batch_plug_in.batches, [3])
+
+    def test_async_concurrency_limit(self):
+        """ Async plug-ins are awaited concurrently up to the limit, and messages are not mixed """
+        plug_in = SlowAsyncPlugIn()
+        queries = [dict(self.query, attributes={'width': i}) for i in range(8)]
+        estimations = asyncio.run(get_best_estimates_async([plug_in], queries, True, 3))
+        self.assertEqual([e.value for e in estimations], list(range(8)))
+        self.assertEqual(plug_in.max_in_flight, 3)
+        for i, estimation in enumerate(estimations):
+            self.assertEqual(estimation.messages, [f'Estimating width {i}'])
+
+    def test_async_plug_in_from_running_loop(self):
+        """ Async plug-ins can be called by the sync driver from within a running event loop """
+        async def host():
+            return get_best_estimates([SlowAsyncPlugIn()], [dict(self.query, attributes={'width': 3})], True)
+        self.assertEqual(asyncio.run(host())[0].value, 3)
+
+    def test_async_driver_runs_sync_plug_ins(self):
+        """ Sync plug-ins are called through a thread pool and select as in the sync driver """
+        queries = [dict(self.query, attributes={'width': i}) for i in range(6)]
+        estimations = asyncio.run(get_best_estimates_async(
+            [BatchPlugIn(), FallbackPlugIn()], queries, True, 4))
+        self.assertEqual([e.value for e in estimations], [0, 1, 2, 1, 4, 1])
+        self.assertEqual([e.estimator_name for e in estimations][:2],
+                         ['batch_plug_in', 'fallback_plug_in'])
+
+    def test_accuracy_ceiling(self):
+        """ Plug-ins after one with 100% accuracy are only checked if it fails to estimate """
+        low, top, later = [AccuracyCheckingPlugIn(n, a) for n, a in
+                           [('low', 50), ('top', 100), ('later', 100)]]
+        self.assertEqual(get_best_estimates([low, top, later], [self.query], True)[0].value, 100)
+        self.assertEqual([p.num_checks for p in (low, top, later)], [1, 1, 0])
+
+        top.fails = True
+        estimation = get_best_estimates([low, top, later], [self.query], True)[0]
+        self.assertEqual(estimation.estimator_name, 'later')
+        self.assertEqual([p.num_checks for p in (low, top, later)], [2, 2, 1])
+
+    def test_lower_accuracy_ceiling(self):
+        """ Plug-ins at or above a lower ceiling are equal, so the first one is used """
+        first, better = AccuracyCheckingPlugIn('first', 80), AccuracyCheckingPlugIn('better', 90)
+        index = PlugInIndex([first, better], accuracy_ceiling=75)
+        self.assertEqual(get_best_estimates(index, [self.query], True)[0].estimator_name, 'first')
+        self.assertEqual(better.num_checks, 0)
+
+    def test_pinned_plug_in(self):
+        """ A query that pins a plug-in does not query the others """
+        top, pinned = AccuracyCheckingPlugIn('top', 100), AccuracyCheckingPlugIn('pinned', 50)
+        query = dict(self.query, attributes={'width': 8, 'plug_in': 'pinned'})
+        self.assertEqual(get_best_estimates([top, pinned], [query], True)[0].value, 50)
+        self.assertEqual(top.num_checks, 0)
+
+    def test_profile_and_hooks(self):
+        """ Calls are profiled per plug-in, method, and class, and hooks wrap every call """
+        plug_in = HookedPlugIn()
+        profiler = PlugInProfiler()
+        set_profiler(profiler)
+        try:
+            for _ in range(2):
+                get_best_estimates([plug_in], [self.query], True)
+        finally:
+            set_profiler(None)
+        report = profiler.get_report()['plugin_profile']
+        self.assertEqual((report['count'], report['repeated_queries']), (4, 2))
+        methods = report['plug_ins']['cached_plug_in']['classes']['adder']['methods']
+        self.assertEqual(methods['estimate_energy']['count'], 2)
+        self.assertEqual(methods['primitive_action_supported']['repeated_query_rate'], 0.5)
+        self.assertEqual(plug_in.hook_calls[:4], [
+            ('pre', 'primitive_action_supported'), ('post', 'primitive_action_supported', 100),
+            ('pre', 'estimate_energy'), ('post', 'estimate_energy', 1)])
+
+    def test_query_timeout_falls_through(self):
+        """ A call that times out fails, the next plug-in is used, and the timeout is profiled """
+        profiler = PlugInProfiler()
+        set_profiler(profiler)
+        set_watchdog(Watchdog(query_timeout=0.05))
+        try:
+            estimation = get_best_estimates([SleepingPlugIn(), FallbackPlugIn()], [self.query], True)[0]
+        finally:
+            set_watchdog(None)
+            set_profiler(None)
+        self.assertEqual(estimation.estimator_name, 'fallback_plug_in')
+        self.assertTrue(estimation.timed_out)
+        report = profiler.get_report()['plugin_profile']
+        self.assertEqual(report['timeouts'], 1)
+        self.assertEqual(report['plug_ins']['sleeping_plug_in']['methods']['estimate_energy']['timeouts'], 1)
+        self.assertEqual(len(report['timed_out_queries']), 1)
+
+        cache = EstimationCache([SleepingPlugIn(), FallbackPlugIn()], self.cache_dir.name)
+        cache.put(self.query, True, estimation)
+        self.assertIsNone(cache.get(self.query, True))
+
+    def test_async_query_timeout(self):
+        """ Coroutines that time out are cancelled and fail """
+        set_watchdog(Watchdog(query_timeout=0.05))
+        try:
+            estimation = asyncio.run(get_best_estimates_async(
+                [SleepingAsyncPlugIn(), FallbackPlugIn()], [self.query], True, 2))[0]
+        finally:
+            set_watchdog(None)
+        self.assertEqual(estimation.estimator_name, 'fallback_plug_in')
+
+    def test_plug_in_index_candidates(self):
+        """ Plug-ins listing their classes are only candidates for those classes """
+        fallback, adder_only = CountingPlugIn(), AdderOnlyPlugIn()
+        index = PlugInIndex([adder_only, fallback])
+        self.assertEqual(index.get_candidates('adder'), [adder_only, fallback])
+        self.assertEqual(index.get_candidates('multiplier'), [fallback])
+
+
+if __name__ == '__main__':
+    unittest.main()
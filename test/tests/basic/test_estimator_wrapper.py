@@ -0,0 +1,74 @@
+import unittest
+
+from accelergy.plug_in_interface.interface import *
+from accelergy.plug_in_interface.estimator import Estimator, action2energy
+from accelergy.plug_in_interface.estimator_wrapper import EstimatorWrapper
+from accelergy.utils.logging import pop_all_messages
+
+
+class TableEstimator(Estimator):
+    name = 'unpooled_component'
+    percent_accuracy_0_to_100 = 90
+    num_inits = 0
+
+    def __init__(self, width: int, depth: int = 1):
+        super().__init__()
+        TableEstimator.num_inits += 1
+        self.width = width
+        self.logger.info(f'Loaded table for width {width}')
+
+    @action2energy
+    def read(self):
+        return self.width
+
+    @action2energy
+    def write(self, bits: int):
+        return self.width * bits
+
+    def get_area(self):
+        return self.width * 10
+
+
+class PooledEstimator(TableEstimator):
+    name = 'pooled_component'
+    reuse_instances = True
+
+
+class TestEstimatorWrapper(unittest.TestCase):
+    def setUp(self):
+        TableEstimator.num_inits = 0
+
+    def estimate(self, wrapper, attrs, action_name=None, args=None):
+        query = AccelergyQuery(wrapper.class_name, attrs, action_name, args or {})
+        if action_name is None:
+            estimation = wrapper.estimate_area(query)
+        else:
+            estimation = wrapper.estimate_energy(query)
+        return estimation.value, pop_all_messages(wrapper.logger)
+
+    def test_instances_reused(self):
+        """ Queries with the same init arguments share one estimator """
+        wrapper = EstimatorWrapper(PooledEstimator, 'PooledEstimator')
+        first = self.estimate(wrapper, {'width': 8, 'technology': '45nm'}, 'read')
+        self.assertEqual(first[0], 8)
+        self.assertEqual(self.estimate(wrapper, {'width': 8}, 'write', {'bits': 2})[0], 16)
+        self.assertEqual(self.estimate(wrapper, {'width': 8})[0], 80)
+        self.assertEqual(TableEstimator.num_inits, 1)
+        # Unused arguments are still reported and initialization messages are repeated
+        self.assertEqual(self.estimate(wrapper, {'width': 8, 'technology': '45nm'}, 'read'), first)
+        self.assertIn('Loaded table for width 8', first[1])
+        self.assertTrue(any('Unused arguments (technology)' in m for m in first[1]))
+
+        self.estimate(wrapper, {'width': 8, 'depth': 2}, 'read')
+        self.assertEqual(TableEstimator.num_inits, 2)
+
+    def test_reuse_opt_in(self):
+        """ Estimators are initialized for every query unless they opt in to reuse """
+        wrapper = EstimatorWrapper(TableEstimator, 'TableEstimator')
+        for _ in range(3):
+            self.estimate(wrapper, {'width': 4}, 'read')
+        self.assertEqual(TableEstimator.num_inits, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,13 @@
 import unittest
+import accelergy.parsing_utils
 from accelergy.parsing_utils import *
+import os
+import tempfile
+import ruamel.yaml
+import accelergy.utils.yaml
+from accelergy.utils.yaml import get_top_keys, load_yaml, ParsedYAMLCache, set_parsed_yaml_cache
+from accelergy.primitive_library_index import PrimitiveLibraryIndex
+from accelergy.raw_inputs_2_dicts import RawInputs2Dicts
 
 class TestParsingUtils(unittest.TestCase):
     def test_InterpretCopmonentList_plain_name(self):
@@ -55,6 +63,290 @@ class TestParsingUtils(unittest.TestCase):
         name = 'design.PE[0].buffer[0].mux'
         self.assertEqual(get_ranges_or_indices_in_name(name),[0,0])
 
+    def test_ComponentName(self):
+        """ Names are parsed once into their base name, indices, and multiplicity """
+        name = ComponentName.get('design.PE[0..15].buf[2].mux[1..4]')
+        self.assertIs(ComponentName.get('design.PE[0..15].buf[2].mux[1..4]'), name)
+        self.assertEqual(name.base_name, 'design.PE.buf.mux')
+        self.assertEqual(name.indices, ((0, 15), 2, (1, 4)))
+        self.assertEqual(count_num_identical_comps(name.name), 64)
+        self.assertTrue(comp_name_within_range('design.PE[3].buf[2].mux[4]', name.name))
+        self.assertFalse(comp_name_within_range('design.PE[3].buf[2].mux[5]', name.name))
+        self.assertEqual(remove_brackets('design.mac'), 'design.mac')
+        # Parsed names are bounded and forgotten between runs
+        self.assertEqual(ComponentName.get.cache_info().maxsize, COMPONENT_NAME_CACHE_SIZE)
+        reset_parsing_state()
+        self.assertEqual(ComponentName.get.cache_info().currsize, 0)
+
+    def test_FastLoadYAML(self):
+        """ The fast loader keeps quoted strings and merges, and top keys are found without parsing """
+        string = 'action_counts:\n  a: "x"\n  b: \'y\'\n  c: z\n  d: &D {e: 1}\n  f: {<<: *D, g: 2}\nERT: 1\n'
+        loaded = load_yaml(string=string, fast=True)['action_counts']
+        self.assertEqual(loaded, load_yaml(string=string)['action_counts'])
+        self.assertTrue(is_quoted_string(loaded['a']) and is_quoted_string(loaded['b']))
+        self.assertFalse(is_quoted_string(loaded['c']))
+        self.assertEqual(loaded['f'], {'e': 1, 'g': 2})
+        self.assertEqual(get_top_keys(string), {'action_counts', 'ERT'})
+        # Other users of ruamel.yaml's safe loader still get plain strings
+        self.assertIs(type(ruamel.yaml.YAML(typ='safe').load(string)['action_counts']['a']), str)
+        self.assertIsNone(get_top_keys('!include other.yaml'))
+        self.assertEqual(get_top_keys('# comment\n---\nERT:\n  version: 0.4\n...\n'), {'ERT'})
+        for string in ['"ERT": 1\n', '{ERT: 1}\n', '- ERT: 1\n']:
+            self.assertIsNone(get_top_keys(string))
+
+    def test_LoadFile_skips_unneeded(self):
+        """ Files without top keys needed for the requested outputs are not parsed """
+        raw_dicts = RawInputs2Dicts.__new__(RawInputs2Dicts)
+        raw_dicts.fast_load_top_keys = {'action_counts', 'ERT'}
+        raw_dicts.needed_top_keys = {'architecture', 'ERT'}
+        raw_dicts.jobs = 2
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = [os.path.join(tmp, name) for name in ['counts.yaml', 'both.yaml', 'quoted.yaml']]
+            for path, string in zip(paths, ['action_counts: {}\n', 'action_counts: {}\nERT: {}\n',
+                                            '"action_counts": {}\n']):
+                with open(path, 'w') as f:
+                    f.write(string)
+            loaded = [[c['top_key'] for c in content_list] for content_list in raw_dicts.load_files(paths)]
+        self.assertEqual(loaded, [[], ['ERT'], []])
+
+    def test_LoadFiles_parallel(self):
+        """ Loading input files with several jobs gives the same dicts as loading them in order """
+        input_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                 '..', '..', '..', 'examples', 'eyeriss_like', 'input')
+        raw_dicts = [RawInputs2Dicts({'path_arglist': [input_dir], 'parser_version': '0.4', 'jobs': jobs})
+                     for jobs in (1, 2)]
+        self.assertGreater(len(raw_dicts[0].get_cc_classses()), 1)
+        for getter in ['get_flatten_arch_spec_dict', 'get_cc_classses', 'get_pc_classses',
+                       'get_action_counts_dict']:
+            serial, parallel = (dict(getattr(r, getter)()) for r in raw_dicts)
+            self.assertEqual(serial, parallel)
+
+    def test_ParsedYAMLCache(self):
+        """ Parsed files are reused until they or a file that they include changes """
+        with tempfile.TemporaryDirectory() as tmp:
+            main_path, included_path = os.path.join(tmp, 'main.yaml'), os.path.join(tmp, 'included.yaml')
+            with open(main_path, 'w') as f:
+                f.write('a: "x"\n!include included.yaml\n')
+            with open(included_path, 'w') as f:
+                f.write('b: 1\n')
+            cache = ParsedYAMLCache(os.path.join(tmp, 'cache'))
+            set_parsed_yaml_cache(cache)
+            try:
+                self.assertEqual(load_yaml(main_path), {'a': 'x', 'b': 1})
+                loaded = load_yaml(main_path)
+                self.assertEqual((cache.hits, cache.misses), (1, 1))
+                self.assertTrue(is_quoted_string(loaded['a']))
+                with open(included_path, 'w') as f:
+                    f.write('b: 22\n')
+                self.assertEqual(load_yaml(main_path), {'a': 'x', 'b': 22})
+                self.assertEqual((cache.hits, cache.misses), (1, 2))
+                os.utime(main_path, ns=(0, 0))  # Touched, but unchanged
+                self.assertEqual(load_yaml(main_path), {'a': 'x', 'b': 22})
+                self.assertEqual((cache.hits, cache.misses), (2, 2))
+            finally:
+                set_parsed_yaml_cache(None)
+
+    def test_ParsedYAMLCache_include_tags(self):
+        """ Files included with the !include and !includedir tags are fingerprinted too """
+        with tempfile.TemporaryDirectory() as tmp:
+            main_path, included_path = os.path.join(tmp, 'main.yaml'), os.path.join(tmp, 'included.yaml')
+            os.mkdir(os.path.join(tmp, 'dir'))
+            with open(main_path, 'w') as f:
+                f.write('a: !include included.yaml\nc: !includedir dir\n')
+            with open(included_path, 'w') as f:
+                f.write('b: 1\n')
+            with open(os.path.join(tmp, 'dir', 'one.yaml'), 'w') as f:
+                f.write('d: 1\n')
+            cache = ParsedYAMLCache(os.path.join(tmp, 'cache'))
+            set_parsed_yaml_cache(cache)
+            try:
+                for fast in (False, True):
+                    self.assertEqual(load_yaml(main_path, fast=fast), {'a': {'b': 1}, 'c': [{'d': 1}]})
+                    self.assertEqual(load_yaml(main_path, fast=fast), {'a': {'b': 1}, 'c': [{'d': 1}]})
+                self.assertEqual((cache.hits, cache.misses), (2, 2))
+                with open(included_path, 'w') as f:
+                    f.write('b: 22\n')
+                self.assertEqual(load_yaml(main_path), {'a': {'b': 22}, 'c': [{'d': 1}]})
+                self.assertEqual((cache.hits, cache.misses), (2, 3))
+                with open(os.path.join(tmp, 'dir', 'two.yaml'), 'w') as f:
+                    f.write('d: 2\n')
+                self.assertEqual(len(load_yaml(main_path)['c']), 2)
+                self.assertEqual((cache.hits, cache.misses), (2, 4))
+            finally:
+                set_parsed_yaml_cache(None)
+
+    def test_PrimitiveLibraryIndex(self):
+        """ Libraries are indexed once, and changed or added libraries are picked up """
+        with tempfile.TemporaryDirectory() as tmp:
+            lib_dir = os.path.join(tmp, 'libs')
+            os.mkdir(lib_dir)
+            with open(os.path.join(lib_dir, 'a.lib.yaml'), 'w') as f:
+                f.write('classes:\n- name: adder\n  attributes: {width: 8}\n')
+            parsed = []
+
+            class CountingIndex(PrimitiveLibraryIndex):
+                def parse_library(self, path):
+                    parsed.append(os.path.basename(path))
+                    return super().parse_library(path)
+
+            index = CountingIndex([lib_dir], os.path.join(tmp, 'cache'))
+            classes = index.load()
+            self.assertEqual(list(classes), ['adder'])
+            self.assertEqual(classes['adder']['attributes']['width'], 8)
+            self.assertTrue(os.path.exists(index.path))
+            self.assertEqual(index.load()['adder']['attributes']['width'], 8)
+            self.assertEqual(parsed, ['a.lib.yaml'])
+
+            with open(os.path.join(lib_dir, 'a.lib.yaml'), 'w') as f:
+                f.write('classes:\n- name: adder\n  attributes: {width: 16}\n')
+            with open(os.path.join(lib_dir, 'b.lib.yaml'), 'w') as f:
+                f.write('classes:\n- name: multiplier\n  attributes: {}\n')
+            os.utime(lib_dir, ns=(1, 1))  # Filesystem timestamps may be coarse
+            classes = index.load()
+            self.assertEqual(sorted(classes), ['adder', 'multiplier'])
+            self.assertEqual(classes['adder']['attributes']['width'], 16)
+            self.assertEqual(classes.get_library_file('multiplier'), os.path.join(lib_dir, 'b.lib.yaml'))
+            self.assertEqual(sorted(parsed), ['a.lib.yaml', 'a.lib.yaml', 'b.lib.yaml'])
+
+            # Without a cache directory, nothing is stored and libraries are parsed in every run
+            uncached = CountingIndex([lib_dir])
+            self.assertEqual(sorted(uncached.load()), ['adder', 'multiplier'])
+            self.assertEqual(sorted(uncached.load()), ['adder', 'multiplier'])
+            self.assertIsNone(uncached.path)
+            self.assertEqual(len(parsed), 7)
+
+    def test_ReferencedClassNames(self):
+        """ Only the classes that the architecture uses, directly or through compound classes, are referenced """
+        raw_dicts = RawInputs2Dicts.__new__(RawInputs2Dicts)
+        raw_dicts.flatten_arch_spec_dict = {'components': {
+            'system.buffer': {'class': 'smartbuffer', 'attributes': {}},
+            'system.mac[0..3]': {'class': 'intmac', 'attributes': {}},
+            'system.pe_buffer': {'class': 'SRAM', 'subclass': 'smartbuffer', 'attributes': {}},
+        }}
+        raw_dicts.cc_classes_dict = {
+            'smartbuffer': {'subcomponents': [{'name': 'storage', 'class': 'SRAM'},
+                                              {'name': 'address_generator', 'class': 'intadder'}]},
+            'intmac': {'subcomponents': [{'name': 'multiplier', 'class': 'intmultiplier'},
+                                         {'name': 'buffer', 'class': 'smartbuffer'}]},
+            'unused': {'subcomponents': [{'name': 'adder', 'class': 'fpadder'}]},
+        }
+        self.assertEqual(raw_dicts.get_referenced_class_names(),
+                         ['smartbuffer', 'intmac', 'SRAM', 'intadder', 'intmultiplier'])
+
+    def test_UnreferencedClassesNotDefined(self):
+        """ Compound and primitive classes that the architecture does not reference are not defined """
+        with tempfile.TemporaryDirectory() as tmp:
+            arch_path, components_path = os.path.join(tmp, 'arch.yaml'), os.path.join(tmp, 'components.yaml')
+            with open(arch_path, 'w') as f:
+                f.write('architecture:\n  version: 0.4\n  subtree:\n  - name: system\n    local:\n'
+                        '    - name: outer\n      class: outer\n      attributes: {}\n')
+            with open(components_path, 'w') as f:
+                f.write('compound_components:\n  version: 0.4\n  classes:\n'
+                        '  - {name: outer, attributes: {}, actions: [], subcomponents: [{name: i, class: inner}]}\n'
+                        '  - {name: inner, attributes: {}, actions: [], subcomponents: [{name: e, class: eDRAM}]}\n'
+                        '  - {name: unused, subcomponents: [{name: i, class: inner}]}\n')
+            raw_dicts = RawInputs2Dicts({'path_arglist': [arch_path, components_path], 'parser_version': '0.4'})
+        self.assertEqual(set(raw_dicts.get_cc_classses()), {'outer', 'inner'})
+        self.assertEqual(list(raw_dicts.get_pc_classses()), ['eDRAM'])
+
+    def test_ParseExpression_literals(self):
+        """ Literals are cast as before, and identifiers are evaluated """
+        bindings = {'width': 4}
+        self.assertIs(parse_expression_for_arithmetic('True', bindings, 'test'), True)
+        self.assertEqual(parse_expression_for_arithmetic(' 7 ', bindings, 'test'), 7)
+        self.assertEqual(parse_expression_for_arithmetic('3.5', bindings, 'test'), 3.5)
+        self.assertEqual(parse_expression_for_arithmetic(3.0, bindings, 'test'), 3)
+        self.assertEqual(parse_expression_for_arithmetic('width', bindings, 'test'), 4)
+        self.assertEqual(parse_expression_for_arithmetic('inf', bindings, 'test'), float('inf'))
+
+    def test_CompileExpression_cached(self):
+        """ Expressions are compiled once, and report the names that they use """
+        code, names = compile_expression(' max(width, [d for d in depths][0])')
+        self.assertIs(compile_expression(' max(width, [d for d in depths][0])')[0], code)
+        self.assertTrue({'max', 'width', 'depths'} <= names)
+        self.assertNotIn('d', names)
+        self.assertEqual(parse_expression_for_arithmetic(
+            ' max(width, [d for d in depths][0])', {'width': 4, 'depths': [8]}, 'test'), 8)
+
+    def test_ParseExpression_parsed_values_kept(self):
+        """ Evaluated values are not parsed again, but other equal values are """
+        reset_parsing_state()
+        v = parse_expression_for_arithmetic('4 / 2', {}, 'test')
+        self.assertEqual(type(parse_expression_for_arithmetic(v, {}, 'test')), float)
+        self.assertEqual(type(parse_expression_for_arithmetic(float(str(v)), {}, 'test')), int)
+        # Parsing many other values in the same session doesn't forget it
+        for i in range(accelergy.parsing_utils.PARSING_CACHE_SIZE + 1):
+            accelergy.parsing_utils.PARSED_VALUES.add(float(i))
+        self.assertEqual(type(parse_expression_for_arithmetic(v, {}, 'test')), float)
+        reset_parsing_state()
+        self.assertEqual(type(parse_expression_for_arithmetic(v, {}, 'test')), int)
+
+    def test_BoundedCache(self):
+        """ Caches drop their oldest entries past their size """
+        cache = BoundedCache(2)
+        for i in range(3):
+            cache[i] = i
+        self.assertEqual(list(cache), [1, 2])
+
+    def test_ParseExpressionsSequentially_bindings(self):
+        """ Keys see the keys before them, which replace bindings, and later undefined keys """
+        parsed = parse_expressions_sequentially_replacing_bindings(
+            {'a': 'width * 2', 'width': 'a + 1', 'b': 'c + width', 'c': 1}, {'width': 3}, 'test.')
+        self.assertEqual(parsed, {'a': 6, 'width': 7, 'b': 8, 'c': 1})
+        self.assertEqual(list(parsed), ['a', 'width', 'b', 'c'])
+
+    def test_ParseExpressionsSequentially_cycle(self):
+        """ Circular references are an error """
+        with self.assertRaises(SystemExit):
+            parse_expressions_sequentially_replacing_bindings({'a': 'b', 'b': 'a + 1'}, {}, 'test.')
+
+    def test_FullyDefineArchDict_attributes(self):
+        """ Architecture attributes are resolved like compound component attributes """
+        from accelergy.arch_dict_2_obj import fully_define_arch_dict
+        def arch(attributes):
+            return {'components': {'system.buf': {'class': 'buffer', 'attributes': attributes}}}
+        arch_dict = fully_define_arch_dict(
+            arch({'depth': 'width * 2', 'width': 8, 'energy': 1.0}), {}, {})
+        self.assertEqual(arch_dict['components']['system.buf']['attributes'],
+                         {'depth': 16, 'width': 8, 'energy': 1.0})
+        with self.assertRaises(SystemExit):
+            fully_define_arch_dict(arch({'depth': 'width', 'width': 'depth'}), {}, {})
+
+    def test_FoldConstant(self):
+        """ Only expressions without names whose values parse to themselves are folded """
+        self.assertEqual(fold_constant('2 * 1024', 'test'), 2048)
+        self.assertEqual(fold_constant('1 / 4', 'test'), 0.25)
+        self.assertEqual(fold_constant('4 / 2', 'test'), '4 / 2')
+        self.assertEqual(fold_constant('depth * 2', 'test'), 'depth * 2')
+        self.assertEqual(fold_constant('45nm', 'test'), '45nm')
+
+    @unittest.skipIf(accelergy.parsing_utils.np is None, 'NumPy is not installed')
+    def test_ParseExpression_sweep(self):
+        """ Expressions over sweep columns give a column, with or without elementwise functions """
+        import numpy as np
+        bindings = {'depth': np.array([64, 128, 256]), 'width': np.array([8, 16, 32]), 'n': 2}
+        parsed = parse_expressions_sequentially_replacing_bindings(
+            {'size': 'depth * width / 8', 'bits': 'ceil(log2(depth)) * n',
+             'big': '1 if depth > 100 else 0', 'f': 'erf(depth / 1000) > 0'}, bindings, 'test.')
+        self.assertEqual(parsed['size'].tolist(), [64, 256, 1024])
+        self.assertEqual(parsed['bits'].tolist(), [12, 14, 16])
+        self.assertEqual(parsed['big'].tolist(), [0, 1, 1])
+        self.assertEqual(parsed['f'].tolist(), [True] * 3)
+
+    @unittest.skipIf(accelergy.parsing_utils.np is None, 'NumPy is not installed')
+    def test_ParseExpression_sweep_matches_scalar(self):
+        """ Integers over sweep columns don't overflow, and each point matches scalar evaluation """
+        import numpy as np
+        bindings = {'depth': np.array([2 ** 40, 2 ** 62]), 'width': np.array([2 ** 40, 3])}
+        for expression in ['depth * width', 'ceil(log2(depth)) + width', 'max(depth, width) // 7']:
+            column = parse_expression_for_arithmetic(expression, bindings, 'test')
+            for i in range(2):
+                scalar = parse_expression_for_arithmetic(
+                    expression, {'depth': bindings['depth'][i].item(), 'width': bindings['width'][i].item()}, 'test')
+                self.assertEqual(column[i], scalar)
+                self.assertIs(type(column[i]), type(scalar))
+        self.assertEqual(parse_expression_for_arithmetic('depth * width', bindings, 'test')[0], 2 ** 80)
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file